@@ -1,6 +1,6 @@
 import os
 from dotenv import load_dotenv
-from typing import TypedDict
+from typing import Optional, TypedDict
 
 load_dotenv()
 
@@ -25,6 +25,80 @@ class Config(TypedDict):
     AZURE_OPENAI_CHAT_DEPLOYMENT_KEY: str
     AZURE_OPENAI_EMBEDDING_DEPLOYMENT_MODEL: str
     AZURE_OPENAI_EMBEDDING_DEPLOYMENT_KEY: str
+    AZURE_OPENAI_EMBEDDING_MAX_BATCH_SIZE: int
+    AZURE_OPENAI_EMBEDDING_MAX_BATCH_TOKENS: int
+    AZURE_OPENAI_EMBEDDING_MAX_INPUT_TOKENS: int
+    AZURE_OPENAI_EMBEDDING_DIMENSIONS: Optional[int]
+    # Caches
+    EMBEDDING_CACHE_PATH: str
+    EMBEDDING_CACHE_MAX_ENTRIES: int
+    QUERY_EMBEDDING_CACHE_MAX_SIZE: int
+    QUERY_EMBEDDING_CACHE_TTL: float
+    GUARDRAILS_CACHE_MAX_SIZE: int
+    GUARDRAILS_CACHE_TTL: float
+    GUARDRAILS_CACHE_IMAGES: bool
+    SEARCH_CACHE_MAX_SIZE: int
+    SEARCH_CACHE_TTL: float
+    INDEX_VERSION_DIR: str
+    # RAG
+    RAG_PIPELINE_WORKERS: int
+    CONTEXT_MAX_TOKENS: int
+    TOOL_OUTPUT_FORMAT: str
+    TOOL_DOC_FIELDS: str
+    RETRIEVAL_MODE: str
+    HIERARCHICAL_SECTIONS: int
+    HIERARCHICAL_MAX_CHUNKS: int
+    AZURE_SEARCH_UPLOAD_MAX_DOCS: int
+    AZURE_SEARCH_UPLOAD_MAX_BYTES: int
+    AZURE_SEARCH_UPLOAD_CONCURRENCY: int
+    AZURE_SEARCH_UPLOAD_MAX_RETRIES: int
+    LOCAL_SEARCH_DIR: str
+    AZURE_SEARCH_HYBRID: bool
+    SEARCH_RRF_K: int
+    SEARCH_FUSION_WEIGHTS: list[float]
+    # Ingestion
+    INGESTION_MANIFEST_DIR: str
+    INGESTION_FULL_REBUILD: bool
+    INGESTION_BATCH_SIZE: int
+    INGESTION_QUEUE_SIZE: int
+    INGESTION_PREPARE_WORKERS: int
+    INGESTION_LLM_CONCURRENCY: int
+    INGESTION_LLM_TIMEOUT: float
+    INGESTION_CHUNKING: str
+    SEMANTIC_CHUNK_MAX_TOKENS: int
+    SEMANTIC_CHUNK_MODE: str
+    SEMANTIC_CHUNK_THRESHOLD: float
+    SEMANTIC_CHUNK_PERCENTILE: float
+    # Rate limits (0 = unlimited) and retries
+    AZURE_OPENAI_CHAT_RPM: int
+    AZURE_OPENAI_CHAT_TPM: int
+    AZURE_OPENAI_EMBEDDING_RPM: int
+    AZURE_OPENAI_EMBEDDING_TPM: int
+    AZURE_SEARCH_RPM: int
+    WATSONX_RPM: int
+    RETRY_MAX_ATTEMPTS: int
+    RETRY_BASE_DELAY: float
+    RETRY_MAX_DELAY: float
+    # Chat server and agent history
+    CHAT_SERVER_HOST: str
+    CHAT_SERVER_PORT: int
+    CHAT_MAX_SESSIONS: int
+    CHAT_SESSION_TTL: float
+    CHAT_MAX_CONCURRENT_TURNS: int
+    CHAT_MAX_PENDING_TURNS: int
+    CHAT_MAX_MESSAGE_CHARS: int
+    CHAT_HISTORY_MAX_TOKENS: int
+    CHAT_HISTORY_KEEP_TURNS: int
+    CHAT_HISTORY_TOOL_RESULT_TOKENS: int
+    CHAT_HISTORY_SUMMARIZE: bool
+    CHAT_HISTORY_SUMMARY_TOKENS: int
+    CHAT_HISTORY_SUMMARY_TIMEOUT: float
+    # HTTP
+    HTTP_POOL_CONNECTIONS: int
+    HTTP_POOL_MAXSIZE: int
+    HTTP_POOL_BLOCK: bool
+    HTTP_TCP_KEEPALIVE: bool
+    HTTP_TIMEOUT: float
 
 
 config: Config = {
@@ -54,4 +128,107 @@ config: Config = {
     "AZURE_OPENAI_EMBEDDING_DEPLOYMENT_KEY": os.getenv(
         "AZURE_OPENAI_EMBEDDING_DEPLOYMENT_KEY"
     ),
+    "AZURE_OPENAI_EMBEDDING_MAX_BATCH_SIZE": int(
+        os.getenv("AZURE_OPENAI_EMBEDDING_MAX_BATCH_SIZE", "2048")
+    ),
+    "AZURE_OPENAI_EMBEDDING_MAX_BATCH_TOKENS": int(
+        os.getenv("AZURE_OPENAI_EMBEDDING_MAX_BATCH_TOKENS", "100000")
+    ),
+    "AZURE_OPENAI_EMBEDDING_MAX_INPUT_TOKENS": int(
+        os.getenv("AZURE_OPENAI_EMBEDDING_MAX_INPUT_TOKENS", "8191")
+    ),
+    "AZURE_OPENAI_EMBEDDING_DIMENSIONS": (
+        int(os.getenv("AZURE_OPENAI_EMBEDDING_DIMENSIONS"))
+        if os.getenv("AZURE_OPENAI_EMBEDDING_DIMENSIONS")
+        else None
+    ),
+    "EMBEDDING_CACHE_PATH": os.getenv(
+        "EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3"
+    ),
+    "EMBEDDING_CACHE_MAX_ENTRIES": int(
+        os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000")
+    ),
+    "QUERY_EMBEDDING_CACHE_MAX_SIZE": int(
+        os.getenv("QUERY_EMBEDDING_CACHE_MAX_SIZE", "1024")
+    ),
+    "QUERY_EMBEDDING_CACHE_TTL": float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600")),
+    "GUARDRAILS_CACHE_MAX_SIZE": int(os.getenv("GUARDRAILS_CACHE_MAX_SIZE", "4096")),
+    "GUARDRAILS_CACHE_TTL": float(os.getenv("GUARDRAILS_CACHE_TTL", "900")),
+    "GUARDRAILS_CACHE_IMAGES": os.getenv("GUARDRAILS_CACHE_IMAGES", "false").lower()
+    == "true",
+    "SEARCH_CACHE_MAX_SIZE": int(os.getenv("SEARCH_CACHE_MAX_SIZE", "2048")),
+    "SEARCH_CACHE_TTL": float(os.getenv("SEARCH_CACHE_TTL", "3600")),
+    "INDEX_VERSION_DIR": os.getenv("INDEX_VERSION_DIR", ".cache/index-versions"),
+    "RAG_PIPELINE_WORKERS": int(os.getenv("RAG_PIPELINE_WORKERS", "8")),
+    "CONTEXT_MAX_TOKENS": int(os.getenv("CONTEXT_MAX_TOKENS", "2000")),
+    "TOOL_OUTPUT_FORMAT": os.getenv("TOOL_OUTPUT_FORMAT", "json").lower(),
+    "TOOL_DOC_FIELDS": os.getenv(
+        "TOOL_DOC_FIELDS", "title,section_heading,chunk_type,@search.score,content"
+    ),
+    "RETRIEVAL_MODE": os.getenv("RETRIEVAL_MODE", "flat").lower(),
+    "HIERARCHICAL_SECTIONS": int(os.getenv("HIERARCHICAL_SECTIONS", "2")),
+    "HIERARCHICAL_MAX_CHUNKS": int(os.getenv("HIERARCHICAL_MAX_CHUNKS", "20")),
+    "AZURE_SEARCH_UPLOAD_MAX_DOCS": int(
+        os.getenv("AZURE_SEARCH_UPLOAD_MAX_DOCS", "1000")
+    ),
+    "AZURE_SEARCH_UPLOAD_MAX_BYTES": int(
+        os.getenv("AZURE_SEARCH_UPLOAD_MAX_BYTES", "15000000")
+    ),
+    "AZURE_SEARCH_UPLOAD_CONCURRENCY": int(
+        os.getenv("AZURE_SEARCH_UPLOAD_CONCURRENCY", "4")
+    ),
+    "AZURE_SEARCH_UPLOAD_MAX_RETRIES": int(
+        os.getenv("AZURE_SEARCH_UPLOAD_MAX_RETRIES", "5")
+    ),
+    "LOCAL_SEARCH_DIR": os.getenv("LOCAL_SEARCH_DIR", ".cache/search"),
+    "AZURE_SEARCH_HYBRID": os.getenv("AZURE_SEARCH_HYBRID", "true").lower() == "true",
+    "SEARCH_RRF_K": int(os.getenv("SEARCH_RRF_K", "60")),
+    "SEARCH_FUSION_WEIGHTS": [
+        float(w) for w in os.getenv("SEARCH_FUSION_WEIGHTS", "1.0,1.0").split(",")
+    ],
+    "INGESTION_MANIFEST_DIR": os.getenv("INGESTION_MANIFEST_DIR", ".cache/manifests"),
+    "INGESTION_FULL_REBUILD": os.getenv("INGESTION_FULL_REBUILD", "false").lower()
+    == "true",
+    "INGESTION_BATCH_SIZE": int(os.getenv("INGESTION_BATCH_SIZE", "256")),
+    "INGESTION_QUEUE_SIZE": int(os.getenv("INGESTION_QUEUE_SIZE", "4")),
+    "INGESTION_PREPARE_WORKERS": int(os.getenv("INGESTION_PREPARE_WORKERS", "2")),
+    "INGESTION_LLM_CONCURRENCY": int(os.getenv("INGESTION_LLM_CONCURRENCY", "4")),
+    "INGESTION_LLM_TIMEOUT": float(os.getenv("INGESTION_LLM_TIMEOUT", "60")),
+    "INGESTION_CHUNKING": os.getenv("INGESTION_CHUNKING", "tokens").lower(),
+    "SEMANTIC_CHUNK_MAX_TOKENS": int(os.getenv("SEMANTIC_CHUNK_MAX_TOKENS", "1000")),
+    "SEMANTIC_CHUNK_MODE": os.getenv("SEMANTIC_CHUNK_MODE", "threshold").lower(),
+    "SEMANTIC_CHUNK_THRESHOLD": float(os.getenv("SEMANTIC_CHUNK_THRESHOLD", "0.80")),
+    "SEMANTIC_CHUNK_PERCENTILE": float(os.getenv("SEMANTIC_CHUNK_PERCENTILE", "90")),
+    "AZURE_OPENAI_CHAT_RPM": int(os.getenv("AZURE_OPENAI_CHAT_RPM", "0")),
+    "AZURE_OPENAI_CHAT_TPM": int(os.getenv("AZURE_OPENAI_CHAT_TPM", "0")),
+    "AZURE_OPENAI_EMBEDDING_RPM": int(os.getenv("AZURE_OPENAI_EMBEDDING_RPM", "0")),
+    "AZURE_OPENAI_EMBEDDING_TPM": int(os.getenv("AZURE_OPENAI_EMBEDDING_TPM", "0")),
+    "AZURE_SEARCH_RPM": int(os.getenv("AZURE_SEARCH_RPM", "0")),
+    "WATSONX_RPM": int(os.getenv("WATSONX_RPM", "0")),
+    "RETRY_MAX_ATTEMPTS": int(os.getenv("RETRY_MAX_ATTEMPTS", "6")),
+    "RETRY_BASE_DELAY": float(os.getenv("RETRY_BASE_DELAY", "0.5")),
+    "RETRY_MAX_DELAY": float(os.getenv("RETRY_MAX_DELAY", "30")),
+    "CHAT_SERVER_HOST": os.getenv("CHAT_SERVER_HOST", "127.0.0.1"),
+    "CHAT_SERVER_PORT": int(os.getenv("CHAT_SERVER_PORT", "8080")),
+    "CHAT_MAX_SESSIONS": int(os.getenv("CHAT_MAX_SESSIONS", "1000")),
+    "CHAT_SESSION_TTL": float(os.getenv("CHAT_SESSION_TTL", "1800")),
+    "CHAT_MAX_CONCURRENT_TURNS": int(os.getenv("CHAT_MAX_CONCURRENT_TURNS", "16")),
+    "CHAT_MAX_PENDING_TURNS": int(os.getenv("CHAT_MAX_PENDING_TURNS", "64")),
+    "CHAT_MAX_MESSAGE_CHARS": int(os.getenv("CHAT_MAX_MESSAGE_CHARS", "4000")),
+    "CHAT_HISTORY_MAX_TOKENS": int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "6000")),
+    "CHAT_HISTORY_KEEP_TURNS": int(os.getenv("CHAT_HISTORY_KEEP_TURNS", "2")),
+    "CHAT_HISTORY_TOOL_RESULT_TOKENS": int(
+        os.getenv("CHAT_HISTORY_TOOL_RESULT_TOKENS", "200")
+    ),
+    "CHAT_HISTORY_SUMMARIZE": os.getenv("CHAT_HISTORY_SUMMARIZE", "false").lower()
+    == "true",
+    "CHAT_HISTORY_SUMMARY_TOKENS": int(os.getenv("CHAT_HISTORY_SUMMARY_TOKENS", "256")),
+    "CHAT_HISTORY_SUMMARY_TIMEOUT": float(
+        os.getenv("CHAT_HISTORY_SUMMARY_TIMEOUT", "10")
+    ),
+    "HTTP_POOL_CONNECTIONS": int(os.getenv("HTTP_POOL_CONNECTIONS", "10")),
+    "HTTP_POOL_MAXSIZE": int(os.getenv("HTTP_POOL_MAXSIZE", "10")),
+    "HTTP_POOL_BLOCK": os.getenv("HTTP_POOL_BLOCK", "false").lower() == "true",
+    "HTTP_TCP_KEEPALIVE": os.getenv("HTTP_TCP_KEEPALIVE", "true").lower() == "true",
+    "HTTP_TIMEOUT": float(os.getenv("HTTP_TIMEOUT", "30")),
 }
@@ -16,10 +16,16 @@ def chat(azure_agent: AzureAgentModel) -> bool:
         print("\n\nExiting chat...")
         return False
 
-    response, trace = azure_agent.ask(user_input)
+    print("\nAzure Agent: ", end="", flush=True)
+    _, trace = azure_agent.ask_stream(
+        user_input, lambda delta: print(delta, end="", flush=True)
+    )
+    print()
 
-    if response:
-        print(f"\nAzure Agent: {response}")
+    if trace.get("ttft_ms") is not None:
+        print(
+            f"(first token {trace['ttft_ms']} ms, total {trace.get('elapsed_ms')} ms)"
+        )
 
     if trace.get("tools"):
         print("\n--- Agent Internal Trace ---")
@@ -35,8 +41,11 @@ def chat(azure_agent: AzureAgentModel) -> bool:
 def main() -> None:
     azure_agent = AzureAgentModel(config, max_tokens=8192)
     chatting = True
-    while chatting:
-        chatting = chat(azure_agent)
+    try:
+        while chatting:
+            chatting = chat(azure_agent)
+    finally:
+        azure_agent.close()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,14 @@
 from .azure_agent import AzureAgentModel
+from .azure_history import ChatHistoryCompactor
 from .azure_openai import AzureOpenAIModel
+from .azure_search_backend import AzureSearchBackend
+from .azure_search_uploader import AzureSearchUploader
 from .types import (
     AzureSearchParams,
     AzureOpenAIGenerateParams,
     AzureOpenAIGeneratePromptParams,
+    AzureSearchUploadFailure,
+    AzureSearchUploadResult,
 )
 
 __all__ = [
@@ -11,5 +16,10 @@ __all__ = [
     "AzureOpenAIGenerateParams",
     "AzureOpenAIGeneratePromptParams",
     "AzureOpenAIModel",
+    "AzureSearchBackend",
     "AzureSearchParams",
+    "AzureSearchUploader",
+    "AzureSearchUploadFailure",
+    "AzureSearchUploadResult",
+    "ChatHistoryCompactor",
 ]
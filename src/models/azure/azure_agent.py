@@ -1,5 +1,5 @@
 import asyncio, time
-from typing import Annotated, Any, Dict, List, Optional, Tuple
+from typing import Annotated, Any, Callable, Dict, List, Optional, Tuple
 from semantic_kernel.connectors.ai.open_ai import (
     AzureChatCompletion,
     OpenAIChatPromptExecutionSettings,
@@ -8,9 +8,17 @@ from semantic_kernel.functions import kernel_function, KernelArguments
 from semantic_kernel.agents import ChatCompletionAgent
 from semantic_kernel.contents import ChatHistory
 
+from models.azure.azure_history import get_history_compactor
 from models.azure.azure_openai import AzureOpenAIModel
+from models.rag import rag_pipeline  # module import: models.rag imports models.azure
 from models.watson import WatsonXModel
-from utils.parsers import dump_json
+from utils.cache import normalize_text
+from utils.context import pack_context
+from globals import config
+from utils.parsers import format_tool_docs, split_fields
+from utils.loop_runner import get_loop_runner
+from utils.streaming import TextStream
+from utils.tokens import count_tokens
 
 
 class _RunLogger:
@@ -19,6 +27,12 @@ class _RunLogger:
         self.tools: List[Dict[str, Any]] = []
         self.user: Dict[str, Any] = {}
         self.meta: Dict[str, Any] = {}
+        self.history: Dict[str, Any] = {}
+        self.first_token_at: Optional[float] = None
+
+    def mark_first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.time()
 
     def add(self, name: str, args: Dict[str, Any], result: Any, tstart: float) -> None:
         self.tools.append(
@@ -44,7 +58,13 @@ class _RunLogger:
         return {
             "started_at": self.t0,
             "elapsed_ms": round((time.time() - self.t0) * 1000, 1),
+            "ttft_ms": (
+                round((self.first_token_at - self.t0) * 1000, 1)
+                if self.first_token_at
+                else None
+            ),
             "user": self.user,
+            "history": self.history,
             "tools": self.tools,
             "answer": {
                 "text": text,
@@ -72,26 +92,81 @@ class _RunLogger:
         }
 
 
+def _discard(task: asyncio.Task) -> None:
+    """Cancel an unused task; if it already failed, retrieve the error so it is not
+    reported as never retrieved."""
+    if task.done():
+        if not task.cancelled():
+            task.exception()
+    else:
+        task.cancel()
+
+
 class _Tools:
     def __init__(self, logger: _RunLogger):
         self.logger = logger
+        # (normalized query, retrieval task) started alongside the last guardrails check
+        self._prefetch: Optional[Tuple[str, asyncio.Task]] = None
+
+    def clear_prefetch(self) -> None:
+        """Cancel a speculative search that search_docs did not pick up."""
+        prefetch, self._prefetch = self._prefetch, None
+        if prefetch is not None:
+            _discard(prefetch[1])
+
+    def _take_prefetched(self, q: str) -> Optional[asyncio.Task]:
+        prefetch, self._prefetch = self._prefetch, None
+        if prefetch is None:
+            return None
+
+        key, search = prefetch
+        if key == normalize_text(q):
+            return search
+
+        _discard(search)
+        return None
 
     @kernel_function(description="Guardrails check: returns 'safe' or 'unsafe'")
-    def guardrails_check(self, q: Annotated[str, "User query"]) -> str:
+    async def guardrails_check(self, q: Annotated[str, "User query"]) -> str:
         t0 = time.time()
-        r = WatsonXModel.guardrails_check(
-            [{"role": "user", "content": [{"type": "text", "text": q}]}]
+
+        # retrieval runs while guardrails classifies; search_docs picks it up if safe
+        search = rag_pipeline.RagPipeline.start_async_search(
+            {"query": q, "use_vectors": True}
         )
+        try:
+            r = await WatsonXModel.async_guardrails_check(
+                [{"role": "user", "content": [{"type": "text", "text": q}]}]
+            )
+        except Exception:
+            search.cancel()
+            raise
+
         out = "unsafe" if "unsafe" in r.lower() else "safe"
+
+        self.clear_prefetch()
+        if out == "safe":
+            self._prefetch = (normalize_text(q), search)
+        else:
+            search.cancel()
+
         self.logger.add("guardrails_check", {"q": q}, out, t0)
         return out
 
     @kernel_function(
-        description="Vector search over indexed docs; returns JSON list of docs"
+        description="Search indexed docs; returns the most relevant passages with scores"
     )
-    def search_docs(self, q: Annotated[str, "User query"]) -> str:
+    async def search_docs(self, q: Annotated[str, "User query"]) -> str:
         t0 = time.time()
-        docs = AzureOpenAIModel.azure_search({"query": q, "use_vectors": True})
+        search = self._take_prefetched(q)
+        docs = (
+            await search
+            if search is not None
+            else await rag_pipeline.RagPipeline.async_retrieve(
+                {"query": q, "use_vectors": True}
+            )
+        )
+        docs = pack_context(docs)
         preview = {"count": len(docs)}
 
         if docs:
@@ -105,8 +180,17 @@ class _Tools:
                     }
                 )
 
+        payload = format_tool_docs(
+            docs,
+            split_fields(config["TOOL_DOC_FIELDS"]),
+            config["TOOL_OUTPUT_FORMAT"],
+        )
+        # the payload stays in the chat history, so its size is paid on every later turn
+        preview["tokens"] = count_tokens(payload)
+        preview["bytes"] = len(payload.encode("utf-8"))
+
         self.logger.add("search_docs", {"q": q}, preview, t0)
-        return dump_json(docs)
+        return payload
 
 
 class AzureAgentModel:
@@ -120,16 +204,17 @@ class AzureAgentModel:
         temperature: float = 0.0,
         max_tokens: Optional[int] = None,
         top_p: Optional[float] = None,
+        service: Optional[AzureChatCompletion] = None,
     ):
+        """Chat history and run trace are per instance; pass a shared `service`
+        to reuse one chat client across many instances (e.g. server sessions)."""
         self.config = config
         self.logger = _RunLogger()
+        self.tools = _Tools(self.logger)
 
-        self.service = AzureChatCompletion(
-            deployment_name=config["AZURE_OPENAI_CHAT_DEPLOYMENT_MODEL"],
-            endpoint=config["AZURE_OPENAI_CHAT_DEPLOYMENT_URL"],
-            api_key=config["AZURE_OPENAI_CHAT_DEPLOYMENT_KEY"],
-            api_version=config["AZURE_OPENAI_CHAT_DEPLOYMENT_VERSION"],
-        )
+        # a shared service is closed by whoever created it
+        self._owns_service = service is None
+        self.service = service or AzureAgentModel.create_service(config)
 
         settings = OpenAIChatPromptExecutionSettings()
         settings.temperature = temperature
@@ -140,16 +225,22 @@ class AzureAgentModel:
         if max_tokens is not None:
             settings.max_tokens = max_tokens
 
+        # hierarchical retrieval already returns the right granularity
+        chunk_guidance = (
+            ""
+            if config.get("RETRIEVAL_MODE") == "hierarchical"
+            else "Use `summary` chunks for broad context, `heading` chunks for "
+            "navigation, and `detailed` chunks for exact answers ONLY if "
+            "`heading` and `summary` are insufficient. "
+            "If only `content` is present (older indexes), use it as before. "
+        )
         system_message = instructions or (
             "You must ALWAYS call `guardrails_check` first. "
             "NEVER answer directly from your own knowledge. "
             "If 'unsafe', refuse and suggest allowed help. "
             "If 'safe', you MUST call `search_docs` to retrieve documents. "
-            "Parse the JSON returned. "
-            "Use `summary` chunks for broad context, `heading` chunks for "
-            "navigation, and `detailed` chunks for exact answers ONLY if "
-            "`heading` and `summary` are insufficient. "
-            "If only `content` is present (older indexes), use it as before. "
+            "Read the passages it returns. "
+            f"{chunk_guidance}"
             "Answer ONLY from the retrieved docs. "
             "If insufficient, say: 'I'm sorry, I couldn't find any information "
             "about that. Can you please reword your question?' "
@@ -161,30 +252,52 @@ class AzureAgentModel:
             service=self.service,
             name="Banking-RAG",
             instructions=system_message,
-            plugins=[_Tools(self.logger)],
+            plugins=[self.tools],
             arguments=KernelArguments(settings),
         )
 
         self.chat_history = ChatHistory(system_message=system_message)
+        # keeps the prompt sent each turn under CHAT_HISTORY_MAX_TOKENS
+        self.compactor = get_history_compactor()
+
+    @staticmethod
+    def create_service(config: Dict[str, str]) -> AzureChatCompletion:
+        return AzureChatCompletion(
+            deployment_name=config["AZURE_OPENAI_CHAT_DEPLOYMENT_MODEL"],
+            endpoint=config["AZURE_OPENAI_CHAT_DEPLOYMENT_URL"],
+            api_key=config["AZURE_OPENAI_CHAT_DEPLOYMENT_KEY"],
+            api_version=config["AZURE_OPENAI_CHAT_DEPLOYMENT_VERSION"],
+        )
 
     def reset_chat_history(self, system_message: Optional[str] = None) -> None:
         if system_message is None:
             system_message = self.agent.instructions
         self.chat_history = ChatHistory(system_message=system_message)
 
-    async def async_ask(self, question: str) -> Tuple[str, Dict[str, Any]]:
-        """Async ask. Returns (answer_text, full_trace_dict)."""
+    def _start_turn(self, question: str) -> None:
         self.chat_history.add_user_message(question)
         self.logger.t0 = time.time()
+        self.logger.first_token_at = None
         self.logger.user = {"question": question}
         self.logger.tools.clear()
 
+    async def _compact_history(self) -> None:
+        self.logger.history = await self.compactor.compact(self.chat_history)
+
+    async def async_ask(self, question: str) -> Tuple[str, Dict[str, Any]]:
+        """Async ask. Returns (answer_text, full_trace_dict)."""
+        self._start_turn(question)
+        await self._compact_history()
+
         try:
             resp = await asyncio.wait_for(
                 self.agent.get_response(self.chat_history), timeout=15
             )
         except asyncio.TimeoutError:
             return "", {"error": "timeout", "tools": self.logger.tools}
+        finally:
+            # a prefetch the model never used must not run on or leak into the next turn
+            self.tools.clear_prefetch()
 
         # extract plain text
         text = getattr(resp, "value", None) or " ".join(
@@ -199,6 +312,56 @@ class AzureAgentModel:
         trace = self.logger.finalize(resp, text or "")
         return text or "", trace
 
+    def async_ask_stream(self, question: str) -> TextStream:
+        """Streamed ask. Iterate for answer text deltas; `trace` holds the full trace
+        (including time-to-first-token) once the stream is exhausted."""
+
+        async def produce(stream: TextStream):
+            self._start_turn(question)
+            await self._compact_history()
+            last = None
+
+            try:
+                async with asyncio.timeout(15):
+                    async for item in self.agent.invoke_stream(self.chat_history):
+                        last = item.message
+                        delta = getattr(last, "content", None) or ""
+                        if delta:
+                            self.logger.mark_first_token()
+                        yield delta
+            except TimeoutError:
+                stream.trace.update({"error": "timeout", "tools": self.logger.tools})
+                return
+            finally:
+                self.tools.clear_prefetch()
+
+            if stream.text:
+                self.chat_history.add_assistant_message(stream.text)
+
+            stream.trace.update(self.logger.finalize(last, stream.text))
+
+        return TextStream(produce)
+
+    def close(self) -> None:
+        """Close this agent's chat client (sync API); shared services are left open."""
+        client = getattr(self.service, "client", None)
+        if self._owns_service and client is not None:
+            get_loop_runner().run(client.close())
+
     def ask(self, question: str) -> Tuple[str, Dict[str, Any]]:
         """Sync wrapper for tests."""
-        return asyncio.run(self.async_ask(question))
+        return get_loop_runner().run(self.async_ask(question))
+
+    def ask_stream(
+        self, question: str, on_delta: Callable[[str], None]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Sync streamed ask: calls on_delta (on the runner thread) for each text delta,
+        returns (answer_text, trace)."""
+
+        async def consume() -> Tuple[str, Dict[str, Any]]:
+            stream = self.async_ask_stream(question)
+            async for delta in stream:
+                on_delta(delta)
+            return stream.text, stream.trace
+
+        return get_loop_runner().run(consume())
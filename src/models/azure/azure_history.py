@@ -0,0 +1,194 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+from semantic_kernel.contents import (
+    AuthorRole,
+    ChatHistory,
+    ChatMessageContent,
+    FunctionCallContent,
+    FunctionResultContent,
+)
+
+from globals import config
+from utils.tokens import count_tokens
+from .azure_openai import AzureOpenAIModel
+
+# per-message framing tokens (role, separators) in the chat format
+_MESSAGE_OVERHEAD = 4
+_SUMMARY_KEY = "history_summary"
+
+Summarizer = Callable[[str, str], Awaitable[str]]
+
+
+def _message_text(message: ChatMessageContent) -> str:
+    parts = []
+    for item in message.items:
+        if isinstance(item, FunctionResultContent):
+            parts.append(str(item.result))
+        elif isinstance(item, FunctionCallContent):
+            parts.append(f"{item.name}({item.arguments or ''})")
+        elif getattr(item, "text", None):
+            parts.append(item.text)
+    return "\n".join(parts)
+
+
+class ChatHistoryCompactor:
+    """Keeps a chat history under a per-turn prompt token budget.
+
+    Applied before each turn, in order, until the history fits:
+
+    1. Tool results longer than `tool_result_tokens` are replaced by a short
+       stub (calls stay paired with their results): first outside the last
+       `keep_turns` turns, then in them.
+    2. The oldest turns are dropped whole, never the last `keep_turns`. With a
+       `summarizer`, dropped turns are folded into one running summary message
+       after the system prompt. A summary call that fails or takes longer than
+       `summary_timeout` seconds keeps the previous summary.
+    3. If the recent turns alone are still over budget, they are dropped,
+       oldest first, down to the current user message.
+
+    Token counts are cached on each message's metadata.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        *,
+        keep_turns: int = 2,
+        tool_result_tokens: int = 200,
+        summarizer: Optional[Summarizer] = None,
+        summary_timeout: float = 10.0,
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.tool_result_tokens = tool_result_tokens
+        self.summarizer = summarizer
+        self.summary_timeout = summary_timeout
+
+    @staticmethod
+    def tokens(message: ChatMessageContent) -> int:
+        cached = message.metadata.get("tokens")
+        if cached is None:
+            cached = count_tokens(_message_text(message)) + _MESSAGE_OVERHEAD
+            message.metadata["tokens"] = cached
+        return cached
+
+    def total(self, messages: List[ChatMessageContent]) -> int:
+        return sum(self.tokens(m) for m in messages)
+
+    def _stub_tool_results(self, turns: List[List[ChatMessageContent]]) -> None:
+        for turn in turns:
+            for message in turn:
+                if not any(isinstance(i, FunctionResultContent) for i in message.items):
+                    continue
+                if self.tokens(message) <= self.tool_result_tokens:
+                    continue
+
+                omitted = self.tokens(message)
+                message.items = [
+                    (
+                        item.model_copy(
+                            update={
+                                "result": f"[{item.function_name} result omitted "
+                                f"from history: {omitted} tokens]"
+                            }
+                        )
+                        if isinstance(item, FunctionResultContent)
+                        else item
+                    )
+                    for item in message.items
+                ]
+                message.metadata.pop("tokens", None)
+
+    async def compact(self, history: ChatHistory) -> dict:
+        """Compact `history` in place; returns what was done, for the run trace."""
+        head: List[ChatMessageContent] = []
+        summary: Optional[ChatMessageContent] = None
+        turns: List[List[ChatMessageContent]] = []
+
+        for message in history.messages:
+            if message.metadata.get(_SUMMARY_KEY):
+                summary = message
+            elif message.role == AuthorRole.SYSTEM and not turns:
+                head.append(message)
+            elif message.role == AuthorRole.USER or not turns:
+                turns.append([message])
+            else:
+                turns[-1].append(message)
+
+        stats = {"tokens_before": self.total(history.messages), "summarized": False}
+
+        def size() -> int:
+            messages = head + ([summary] if summary else [])
+            return self.total(messages) + sum(self.total(t) for t in turns)
+
+        if size() > self.max_tokens:
+            self._stub_tool_results(turns[: -self.keep_turns or None])
+        if size() > self.max_tokens:
+            self._stub_tool_results(turns)
+
+        dropped: List[ChatMessageContent] = []
+        while size() > self.max_tokens and len(turns) > self.keep_turns:
+            dropped += turns.pop(0)
+
+        if dropped and self.summarizer is not None:
+            previous = summary.metadata[_SUMMARY_KEY] if summary else ""
+            transcript = "\n".join(
+                f"{m.role.value}: {_message_text(m)}" for m in dropped
+            )
+            try:
+                text = await asyncio.wait_for(
+                    self.summarizer(previous, transcript), self.summary_timeout
+                )
+            except Exception as e:
+                # dropping alone already met the budget; the turn must not fail here
+                stats["summary_error"] = repr(e)
+            else:
+                summary = ChatMessageContent(
+                    role=AuthorRole.SYSTEM,
+                    content=f"Summary of the earlier conversation: {text}",
+                    metadata={_SUMMARY_KEY: text},
+                )
+                stats["summarized"] = True
+
+        while size() > self.max_tokens and len(turns) > 1:
+            dropped += turns.pop(0)
+
+        stats["dropped_turns"] = sum(1 for m in dropped if m.role == AuthorRole.USER)
+        history.messages = (
+            head + ([summary] if summary else []) + [m for t in turns for m in t]
+        )
+        stats["tokens_after"] = self.total(history.messages)
+        return stats
+
+
+async def summarize_with_azure_openai(previous: str, transcript: str) -> str:
+    """Default summarizer: fold `transcript` into the `previous` summary."""
+    prompt = (
+        "Update the summary of a customer support conversation. Keep facts the "
+        "user stated, their questions and the answers given; be brief.\n\n"
+        f"Current summary:\n{previous or '(none)'}\n\n"
+        f"New messages:\n{transcript}"
+    )
+    return await AzureOpenAIModel.async_azure_openai_generate(
+        {
+            "messages": [
+                {"role": "user", "content": [{"type": "text", "text": prompt}]}
+            ],
+            "max_tokens": config["CHAT_HISTORY_SUMMARY_TOKENS"],
+            "temperature": 0.0,
+        }
+    )
+
+
+def get_history_compactor() -> ChatHistoryCompactor:
+    """Compactor configured from `CHAT_HISTORY_*` settings."""
+    return ChatHistoryCompactor(
+        config["CHAT_HISTORY_MAX_TOKENS"],
+        keep_turns=config["CHAT_HISTORY_KEEP_TURNS"],
+        tool_result_tokens=config["CHAT_HISTORY_TOOL_RESULT_TOKENS"],
+        summarizer=(
+            summarize_with_azure_openai if config["CHAT_HISTORY_SUMMARIZE"] else None
+        ),
+        summary_timeout=config["CHAT_HISTORY_SUMMARY_TIMEOUT"],
+    )
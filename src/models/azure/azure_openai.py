@@ -1,10 +1,25 @@
 from azure.ai.inference import EmbeddingsClient
+from azure.ai.inference.aio import EmbeddingsClient as AsyncEmbeddingsClient
 from azure.core.credentials import AzureKeyCredential
-from openai import AzureOpenAI
-import json
-import requests
+from openai import AsyncAzureOpenAI, AzureOpenAI
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
 
 from globals import config
+from utils.cache import TTLCache, normalize_text
+from utils.context import pack_context
+from utils.embedding_cache import EmbeddingCache, get_embedding_cache
+from utils.fusion import reciprocal_rank_fusion
+from utils.index_version import get_index_version
+from utils.ratelimit import RateLimiter
+from utils.registry import client_registry
+from utils.local_search import SearchBackend, get_local_search_index
+from utils.retry import RetryPolicy
+from utils.streaming import TextStream
+from utils.tokens import count_tokens, get_encoding, plan_token_batches
+from .azure_search_backend import AzureSearchBackend
 from .types import (
     AzureSearchParams,
     AzureOpenAIGenerateParams,
@@ -13,47 +28,222 @@ from .types import (
 
 
 class AzureOpenAIModel:
+    query_embedding_cache = TTLCache(
+        maxsize=config["QUERY_EMBEDDING_CACHE_MAX_SIZE"],
+        ttl=config["QUERY_EMBEDDING_CACHE_TTL"],
+    )
+    search_cache = TTLCache(
+        maxsize=config["SEARCH_CACHE_MAX_SIZE"],
+        ttl=config["SEARCH_CACHE_TTL"],
+    )
+
+    # one budget per deployment, shared by every thread and event loop; the SDK
+    # clients below are created with their own retries disabled. Chat completions
+    # are billed generations, so they are called with idempotent=False
+    chat_retry = RetryPolicy(
+        RateLimiter(
+            rpm=config["AZURE_OPENAI_CHAT_RPM"], tpm=config["AZURE_OPENAI_CHAT_TPM"]
+        )
+    )
+    embeddings_retry = RetryPolicy(
+        RateLimiter(
+            rpm=config["AZURE_OPENAI_EMBEDDING_RPM"],
+            tpm=config["AZURE_OPENAI_EMBEDDING_TPM"],
+        )
+    )
+    search_retry = AzureSearchBackend.retry
+    search_executor = ThreadPoolExecutor(
+        max_workers=config["RAG_PIPELINE_WORKERS"], thread_name_prefix="search"
+    )
+
+    @staticmethod
+    def get_chat_client() -> AzureOpenAI:
+        """Shared chat client for the configured deployment, created once per process."""
+        return client_registry.get_or_create(
+            (
+                "azure_openai",
+                config["AZURE_OPENAI_CHAT_DEPLOYMENT_URL"],
+                config["AZURE_OPENAI_CHAT_DEPLOYMENT_VERSION"],
+            ),
+            lambda: AzureOpenAI(
+                api_key=config["AZURE_OPENAI_CHAT_DEPLOYMENT_KEY"],
+                api_version=config["AZURE_OPENAI_CHAT_DEPLOYMENT_VERSION"],
+                azure_endpoint=config["AZURE_OPENAI_CHAT_DEPLOYMENT_URL"],
+                max_retries=0,
+            ),
+        )
+
+    @staticmethod
+    def get_async_chat_client() -> AsyncAzureOpenAI:
+        """Async chat client for the running event loop."""
+        return client_registry.get_or_create_for_loop(
+            (
+                "async_azure_openai",
+                config["AZURE_OPENAI_CHAT_DEPLOYMENT_URL"],
+                config["AZURE_OPENAI_CHAT_DEPLOYMENT_VERSION"],
+            ),
+            lambda: AsyncAzureOpenAI(
+                api_key=config["AZURE_OPENAI_CHAT_DEPLOYMENT_KEY"],
+                api_version=config["AZURE_OPENAI_CHAT_DEPLOYMENT_VERSION"],
+                azure_endpoint=config["AZURE_OPENAI_CHAT_DEPLOYMENT_URL"],
+                max_retries=0,
+            ),
+        )
+
+    @staticmethod
+    def _embeddings_endpoint() -> str:
+        return f"{config["AZURE_OPENAI_RESOURCE_URL"]}openai/deployments/embeddings"
+
+    @staticmethod
+    def get_embeddings_client() -> EmbeddingsClient:
+        """Shared embeddings client for the configured deployment, created once per process."""
+        endpoint = AzureOpenAIModel._embeddings_endpoint()
+
+        return client_registry.get_or_create(
+            (
+                "azure_embeddings",
+                endpoint,
+                config["AZURE_OPENAI_EMBEDDING_DEPLOYMENT_MODEL"],
+            ),
+            lambda: EmbeddingsClient(
+                endpoint=endpoint,
+                credential=AzureKeyCredential(
+                    config["AZURE_OPENAI_EMBEDDING_DEPLOYMENT_KEY"]
+                ),
+                retry_total=0,
+            ),
+        )
+
+    @staticmethod
+    def get_async_embeddings_client() -> AsyncEmbeddingsClient:
+        """Async embeddings client for the running event loop."""
+        endpoint = AzureOpenAIModel._embeddings_endpoint()
+
+        return client_registry.get_or_create_for_loop(
+            (
+                "async_azure_embeddings",
+                endpoint,
+                config["AZURE_OPENAI_EMBEDDING_DEPLOYMENT_MODEL"],
+            ),
+            lambda: AsyncEmbeddingsClient(
+                endpoint=endpoint,
+                credential=AzureKeyCredential(
+                    config["AZURE_OPENAI_EMBEDDING_DEPLOYMENT_KEY"]
+                ),
+                retry_total=0,
+            ),
+        )
+
+    @staticmethod
+    def get_search_backend() -> SearchBackend:
+        """Local in-process index when BYPASS lists azure_search_api, else Azure AI Search."""
+        if "azure_search_api" in config.get("BYPASS", []):
+            return get_local_search_index()
+        return client_registry.get_or_create(
+            ("azure_search_backend",), AzureSearchBackend
+        )
+
+    @staticmethod
+    def _search_cache_key(params: AzureSearchParams):
+        """Results key; the index version makes entries from before the last
+        ingestion unreachable, so they just age out of the LRU."""
+        local = "azure_search_api" in config.get("BYPASS", [])
+        mode = "keyword"
+        if params.get("use_vectors") is True:
+            hybrid = params.get("hybrid", config["AZURE_SEARCH_HYBRID"])
+            mode = "hybrid" if hybrid else "vector"
+
+        return (
+            "local" if local else "azure",
+            config["AZURE_SEARCH_API_INDEX"],
+            get_index_version().get(),
+            normalize_text(params["query"]),
+            params.get("top") or 3,
+            mode,
+            params.get("filter"),
+            params.get("orderby"),
+            params.get("select"),
+        )
+
     @staticmethod
     def azure_search(params: AzureSearchParams):
-        """Run a search query against Azure Cognitive Search."""
-        url = f"{config['AZURE_SEARCH_API_URL']}/indexes/{config['AZURE_SEARCH_API_INDEX']}/docs/search?api-version=2023-11-01"
+        """Run a search query against the configured search backend."""
+        key = AzureOpenAIModel._search_cache_key(params)
+        docs = AzureOpenAIModel.search_cache.get(key)
+        if docs is None:
+            embedding = None
+            if params.get("use_vectors") and params["use_vectors"] is True:
+                embedding = AzureOpenAIModel.azure_openai_generate_query_embedding(
+                    params["query"]
+                )
 
-        headers = {
-            "Content-Type": "application/json",
-            "api-key": config["AZURE_SEARCH_API_PRIMARY_ADMIN_KEY"],
-        }
+            docs = AzureOpenAIModel.get_search_backend().search(params, embedding)
+            AzureOpenAIModel.search_cache.set(key, docs)
 
-        payload = {"search": params["query"], "top": params.get("top", 3)}
+        # callers may edit results; the cached list stays intact
+        return [dict(doc) for doc in docs]
 
-        if params.get("use_vectors") and params["use_vectors"] is True:
-            embedding = AzureOpenAIModel.azure_openai_generate_embedding(
-                params["query"]
-            )
+    @staticmethod
+    async def async_azure_search(params: AzureSearchParams):
+        """Async azure_search; Azure AI Search goes over the pooled async HTTP transport."""
+        key = AzureOpenAIModel._search_cache_key(params)
+        docs = AzureOpenAIModel.search_cache.get(key)
+        if docs is None:
+            embedding = None
+            if params.get("use_vectors") and params["use_vectors"] is True:
+                embedding = (
+                    await AzureOpenAIModel.async_azure_openai_generate_query_embedding(
+                        params["query"]
+                    )
+                )
 
-            payload = {
-                "count": True,
-                "select": "title, content, chunk_type",
-                "vectorQueries": [
-                    {
-                        "kind": "vector",
-                        "vector": embedding,
-                        "fields": "embedding",
-                        "k": params.get("top", 3),
-                    },
-                ],
-            }
-
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
-        if response.status_code >= 400:
-            raise RuntimeError(
-                f"Status code: {response.status_code}. Error: {response.text}"
+            docs = await AzureOpenAIModel.get_search_backend().asearch(
+                params, embedding
             )
+            AzureOpenAIModel.search_cache.set(key, docs)
+
+        return [dict(doc) for doc in docs]
 
-        return response.json().get("value", [])
+    @staticmethod
+    def azure_search_fused(
+        searches: list[AzureSearchParams],
+        weights: Optional[list[float]] = None,
+        top: Optional[int] = None,
+    ):
+        """Run several searches (e.g. query rewrites) concurrently and fuse their
+        rankings client-side with weighted reciprocal rank fusion."""
+        futures = [
+            AzureOpenAIModel.search_executor.submit(AzureOpenAIModel.azure_search, p)
+            for p in searches
+        ]
+        return reciprocal_rank_fusion(
+            [f.result() for f in futures],
+            weights,
+            k=config["SEARCH_RRF_K"],
+            top=top or max(p.get("top") or 3 for p in searches),
+        )
+
+    @staticmethod
+    async def async_azure_search_fused(
+        searches: list[AzureSearchParams],
+        weights: Optional[list[float]] = None,
+        top: Optional[int] = None,
+    ):
+        """Async azure_search_fused; the searches run concurrently on the loop."""
+        rankings = await asyncio.gather(
+            *(AzureOpenAIModel.async_azure_search(p) for p in searches)
+        )
+        return reciprocal_rank_fusion(
+            rankings,
+            weights,
+            k=config["SEARCH_RRF_K"],
+            top=top or max(p.get("top") or 3 for p in searches),
+        )
 
     @staticmethod
     def azure_openai_generate_prompt(params: AzureOpenAIGeneratePromptParams):
-        context = "\n".join(f"- {doc['content']}" for doc in params["context_docs"])
+        docs = pack_context(params["context_docs"], params.get("context_max_tokens"))
+        context = "\n".join(f"- {doc['content']}" for doc in docs)
 
         instructions = params.get(
             "instructions",
@@ -67,14 +257,7 @@ class AzureOpenAIModel:
         )
 
     @staticmethod
-    def azure_openai_generate(params: AzureOpenAIGenerateParams):
-        """Call Azure OpenAI to synthesize an answer from retrieved documents."""
-        client: AzureOpenAI = AzureOpenAI(
-            api_key=config["AZURE_OPENAI_CHAT_DEPLOYMENT_KEY"],
-            api_version=config["AZURE_OPENAI_CHAT_DEPLOYMENT_VERSION"],
-            azure_endpoint=config["AZURE_OPENAI_CHAT_DEPLOYMENT_URL"],
-        )
-
+    def _generate_kwargs(params: AzureOpenAIGenerateParams):
         max_tokens = (
             params["max_tokens"]
             if params.get("max_tokens")
@@ -95,30 +278,260 @@ class AzureOpenAIModel:
             else 1.0
         )
 
-        response = client.chat.completions.create(
-            model=config["AZURE_OPENAI_CHAT_DEPLOYMENT_MODEL"],
-            messages=params["messages"],
-            max_tokens=max_tokens,
-            temperature=temperature,  # range 0.0 -> 2.0 = deterministic -> creative
-            top_p=top_p,  # range 0.0 -> 1.0 = narrow filtering of next-word choices -> wide/no filtering
+        kwargs = {
+            "model": config["AZURE_OPENAI_CHAT_DEPLOYMENT_MODEL"],
+            "messages": params["messages"],
+            "max_tokens": max_tokens,
+            "temperature": temperature,  # range 0.0 -> 2.0 = deterministic -> creative
+            "top_p": top_p,  # range 0.0 -> 1.0 = narrow filtering of next-word choices -> wide/no filtering
+        }
+
+        if params.get("timeout"):
+            kwargs["timeout"] = params["timeout"]  # seconds, per request
+
+        return kwargs
+
+    @staticmethod
+    def _chat_tokens(kwargs) -> int:
+        """Tokens a chat request counts against the TPM quota: prompt + max_tokens."""
+        prompt = 0
+        for message in kwargs["messages"]:
+            content = message.get("content") or ""
+            if isinstance(content, str):
+                prompt += count_tokens(content)
+            else:
+                prompt += sum(count_tokens(part.get("text", "")) for part in content)
+
+        return prompt + kwargs["max_tokens"]
+
+    @staticmethod
+    def azure_openai_generate(params: AzureOpenAIGenerateParams):
+        """Call Azure OpenAI to synthesize an answer from retrieved documents."""
+        client = AzureOpenAIModel.get_chat_client()
+        kwargs = AzureOpenAIModel._generate_kwargs(params)
+
+        response = AzureOpenAIModel.chat_retry.call(
+            partial(client.chat.completions.create, **kwargs),
+            tokens=AzureOpenAIModel._chat_tokens(kwargs),
+            idempotent=False,
+        )
+
+        return response.choices[0].message.content.strip()
+
+    @staticmethod
+    async def async_azure_openai_generate(params: AzureOpenAIGenerateParams):
+        """Async azure_openai_generate."""
+        client = AzureOpenAIModel.get_async_chat_client()
+        kwargs = AzureOpenAIModel._generate_kwargs(params)
+
+        response = await AzureOpenAIModel.chat_retry.acall(
+            partial(client.chat.completions.create, **kwargs),
+            tokens=AzureOpenAIModel._chat_tokens(kwargs),
+            idempotent=False,
         )
 
         return response.choices[0].message.content.strip()
 
+    @staticmethod
+    def async_azure_openai_generate_stream(
+        params: AzureOpenAIGenerateParams,
+    ) -> TextStream:
+        """Stream the answer as text deltas; the returned stream's trace records
+        time-to-first-token, total time and finish reason."""
+
+        async def produce(stream: TextStream):
+            client = AzureOpenAIModel.get_async_chat_client()
+            kwargs = AzureOpenAIModel._generate_kwargs(params)
+
+            # only opening the stream is retried, and only when refused (429/503):
+            # deltas already yielded cannot be replayed
+            response = await AzureOpenAIModel.chat_retry.acall(
+                partial(client.chat.completions.create, **kwargs, stream=True),
+                tokens=AzureOpenAIModel._chat_tokens(kwargs),
+                idempotent=False,
+            )
+
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+
+                choice = chunk.choices[0]
+                if choice.finish_reason:
+                    stream.trace["finish_reason"] = choice.finish_reason
+                if choice.delta and choice.delta.content:
+                    yield choice.delta.content
+
+        return TextStream(produce)
+
     @staticmethod
     def azure_openai_generate_embedding(text: str):
         """Generate an embedding vector for a single text chunk."""
+        return AzureOpenAIModel.azure_openai_generate_embeddings([text])[0]
 
-        client = EmbeddingsClient(
-            endpoint=f"{config["AZURE_OPENAI_RESOURCE_URL"]}openai/deployments/embeddings",
-            credential=AzureKeyCredential(
-                config["AZURE_OPENAI_EMBEDDING_DEPLOYMENT_KEY"]
-            ),
+    @staticmethod
+    async def async_azure_openai_generate_embedding(text: str):
+        """Async azure_openai_generate_embedding."""
+        return (await AzureOpenAIModel.async_azure_openai_generate_embeddings([text]))[
+            0
+        ]
+
+    @staticmethod
+    def _query_embedding_key(query: str):
+        return (
+            config["AZURE_OPENAI_EMBEDDING_DEPLOYMENT_MODEL"],
+            config["AZURE_OPENAI_EMBEDDING_DIMENSIONS"],
+            normalize_text(query),
         )
 
-        response = client.embed(
-            input=[text],
-            model=config["AZURE_OPENAI_EMBEDDING_DEPLOYMENT_MODEL"],
+    @staticmethod
+    def azure_openai_generate_query_embedding(query: str):
+        """Embed a search query, reusing recent embeddings of the same normalized query."""
+        key = AzureOpenAIModel._query_embedding_key(query)
+
+        return AzureOpenAIModel.query_embedding_cache.get_or_set(
+            key, lambda: AzureOpenAIModel.azure_openai_generate_embedding(key[-1])
+        )
+
+    @staticmethod
+    async def async_azure_openai_generate_query_embedding(query: str):
+        """Async azure_openai_generate_query_embedding."""
+        key = AzureOpenAIModel._query_embedding_key(query)
+
+        embedding = AzureOpenAIModel.query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = await AzureOpenAIModel.async_azure_openai_generate_embedding(
+                key[-1]
+            )
+            AzureOpenAIModel.query_embedding_cache.set(key, embedding)
+
+        return embedding
+
+    @staticmethod
+    def _cached_embeddings(texts: list[str]):
+        """Split texts into cache hits and misses: (cache, keys, found, missing)."""
+        cache = get_embedding_cache()
+        if cache is None:
+            keys = list(range(len(texts)))
+            return None, keys, {}, dict(zip(keys, texts))
+
+        model = config["AZURE_OPENAI_EMBEDDING_DEPLOYMENT_MODEL"]
+        dimensions = config["AZURE_OPENAI_EMBEDDING_DIMENSIONS"]
+        keys = [EmbeddingCache.make_key(model, dimensions, text) for text in texts]
+
+        found = cache.get_many(keys)
+        missing = {k: text for k, text in zip(keys, texts) if k not in found}
+
+        return cache, keys, found, missing
+
+    @staticmethod
+    def azure_openai_generate_embeddings(texts: list[str]) -> list[list[float]]:
+        """Generate embeddings for many texts, packing them into as few requests as the
+        deployment's per-request input and token limits allow. Output order matches input.
+        Texts already in the persistent embedding cache are not sent to the service.
+        """
+        if not texts:
+            return []
+
+        cache, keys, found, missing = AzureOpenAIModel._cached_embeddings(texts)
+
+        if missing:
+            inputs, batches, token_counts = AzureOpenAIModel._plan_embedding_batches(
+                list(missing.values())
+            )
+            client = AzureOpenAIModel.get_embeddings_client()
+            embeddings = [None] * len(inputs)
+
+            for batch in batches:
+                response = AzureOpenAIModel.embeddings_retry.call(
+                    partial(
+                        client.embed,
+                        **AzureOpenAIModel._embed_kwargs([inputs[i] for i in batch]),
+                    ),
+                    tokens=sum(token_counts[i] for i in batch),
+                )
+                for item in response.data:
+                    embeddings[batch[item.index]] = item.embedding
+
+            fresh = dict(zip(missing.keys(), embeddings))
+            if cache is not None:
+                cache.put_many(fresh)
+            found.update(fresh)
+
+        return [found[k] for k in keys]
+
+    @staticmethod
+    async def async_azure_openai_generate_embeddings(
+        texts: list[str],
+    ) -> list[list[float]]:
+        """Async azure_openai_generate_embeddings; batches are sent concurrently.
+        Cache lookups and stores run on a worker thread to keep SQLite off the loop."""
+        if not texts:
+            return []
+
+        cache, keys, found, missing = await asyncio.to_thread(
+            AzureOpenAIModel._cached_embeddings, texts
+        )
+
+        if missing:
+            inputs, batches, token_counts = AzureOpenAIModel._plan_embedding_batches(
+                list(missing.values())
+            )
+            client = AzureOpenAIModel.get_async_embeddings_client()
+            embeddings = [None] * len(inputs)
+
+            responses = await asyncio.gather(
+                *(
+                    AzureOpenAIModel.embeddings_retry.acall(
+                        partial(
+                            client.embed,
+                            **AzureOpenAIModel._embed_kwargs(
+                                [inputs[i] for i in batch]
+                            ),
+                        ),
+                        tokens=sum(token_counts[i] for i in batch),
+                    )
+                    for batch in batches
+                )
+            )
+            for batch, response in zip(batches, responses):
+                for item in response.data:
+                    embeddings[batch[item.index]] = item.embedding
+
+            fresh = dict(zip(missing.keys(), embeddings))
+            if cache is not None:
+                await asyncio.to_thread(cache.put_many, fresh)
+            found.update(fresh)
+
+        return [found[k] for k in keys]
+
+    @staticmethod
+    def _embed_kwargs(inputs: list[str]):
+        return {
+            "input": inputs,
+            "model": config["AZURE_OPENAI_EMBEDDING_DEPLOYMENT_MODEL"],
+            "dimensions": config["AZURE_OPENAI_EMBEDDING_DIMENSIONS"],
+        }
+
+    @staticmethod
+    def _plan_embedding_batches(texts: list[str]):
+        """Trim over-long inputs and group them into request-sized batches of indices.
+        Returns (inputs, batches, per-input token counts)."""
+        enc = get_encoding()
+        max_input_tokens = config["AZURE_OPENAI_EMBEDDING_MAX_INPUT_TOKENS"]
+
+        inputs = list(texts)
+        token_counts = []
+        for i, tokens in enumerate(enc.encode_batch(inputs, disallowed_special=())):
+            # the service rejects over-long inputs, so trim them to the limit
+            if len(tokens) > max_input_tokens:
+                tokens = tokens[:max_input_tokens]
+                inputs[i] = enc.decode(tokens)
+            token_counts.append(len(tokens))
+
+        batches = plan_token_batches(
+            token_counts,
+            max_items=config["AZURE_OPENAI_EMBEDDING_MAX_BATCH_SIZE"],
+            max_tokens=config["AZURE_OPENAI_EMBEDDING_MAX_BATCH_TOKENS"],
         )
 
-        return response.data[0].embedding
+        return inputs, batches, token_counts
@@ -0,0 +1,76 @@
+import json
+
+from globals import config
+from utils.http import get_async_http_transport, get_http_transport
+from utils.ratelimit import RateLimiter
+from utils.retry import HttpStatusError, RetryPolicy
+from .types import AzureSearchParams
+
+
+class AzureSearchBackend:
+    """`SearchBackend` for the configured Azure AI Search index."""
+
+    retry = RetryPolicy(RateLimiter(rpm=config["AZURE_SEARCH_RPM"]))
+
+    @staticmethod
+    def _request(params: AzureSearchParams, embedding=None):
+        url = f"{config['AZURE_SEARCH_API_URL']}/indexes/{config['AZURE_SEARCH_API_INDEX']}/docs/search?api-version=2023-11-01"
+
+        headers = {
+            "Content-Type": "application/json",
+            "api-key": config["AZURE_SEARCH_API_PRIMARY_ADMIN_KEY"],
+        }
+
+        payload = {"search": params["query"], "top": params.get("top", 3)}
+
+        if embedding is not None:
+            vector_payload = {
+                "count": True,
+                "select": "title, content, chunk_type",
+                "vectorQueries": [
+                    {
+                        "kind": "vector",
+                        "vector": embedding,
+                        "fields": "embedding",
+                        "k": params.get("top", 3),
+                    },
+                ],
+            }
+            # hybrid keeps the keyword query; the service fuses both rankings with RRF
+            if params.get("hybrid", config["AZURE_SEARCH_HYBRID"]):
+                payload.update(vector_payload)
+            else:
+                payload = vector_payload
+
+        for key in ("select", "filter", "orderby"):
+            if params.get(key):
+                payload[key] = params[key]
+
+        return url, headers, json.dumps(payload)
+
+    @staticmethod
+    def _results(response):
+        if response.status_code >= 400:
+            raise HttpStatusError(response)
+
+        return response.json().get("value", [])
+
+    def search(self, params: AzureSearchParams, embedding=None):
+        url, headers, data = AzureSearchBackend._request(params, embedding)
+
+        return AzureSearchBackend.retry.call(
+            lambda: AzureSearchBackend._results(
+                get_http_transport().post(url, headers=headers, data=data)
+            )
+        )
+
+    async def asearch(self, params: AzureSearchParams, embedding=None):
+        url, headers, data = AzureSearchBackend._request(params, embedding)
+
+        async def search():
+            response = await get_async_http_transport().post(
+                url, headers=headers, content=data
+            )
+            return AzureSearchBackend._results(response)
+
+        return await AzureSearchBackend.retry.acall(search)
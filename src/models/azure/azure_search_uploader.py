@@ -0,0 +1,195 @@
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from globals import Config, config as default_config
+from utils.http import get_http_transport
+from utils.retry import backoff_delay, parse_retry_after
+from .azure_openai import AzureOpenAIModel
+from .types import AzureSearchUploadFailure, AzureSearchUploadResult
+
+# per-document status codes worth retrying (throttling, transient service errors)
+_RETRIABLE_STATUS = {409, 422, 429, 500, 502, 503, 504}
+
+
+class AzureSearchUploader:
+    """Uploads index actions in batches bounded by document count and serialized size,
+    several batches at a time, retrying only the documents that failed."""
+
+    def __init__(
+        self,
+        config: Optional[Config] = None,
+        *,
+        key_field: str = "id",
+        max_batch_docs: Optional[int] = None,
+        max_batch_bytes: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+        backoff_max: Optional[float] = None,
+    ) -> None:
+        self.config = config or default_config
+        self.key_field = key_field
+        self.max_batch_docs = (
+            max_batch_docs or self.config["AZURE_SEARCH_UPLOAD_MAX_DOCS"]
+        )
+        self.max_batch_bytes = (
+            max_batch_bytes or self.config["AZURE_SEARCH_UPLOAD_MAX_BYTES"]
+        )
+        self.concurrency = concurrency or self.config["AZURE_SEARCH_UPLOAD_CONCURRENCY"]
+        self.max_retries = (
+            max_retries
+            if max_retries is not None
+            else self.config["AZURE_SEARCH_UPLOAD_MAX_RETRIES"]
+        )
+        self.backoff_base = backoff_base or self.config["RETRY_BASE_DELAY"]
+        self.backoff_max = backoff_max or self.config["RETRY_MAX_DELAY"]
+        # shares the search service's request budget with queries
+        self.limiter = AzureOpenAIModel.search_retry.limiter
+
+        self.url = f"{self.config['AZURE_SEARCH_API_URL']}/indexes/{self.config['AZURE_SEARCH_API_INDEX']}/docs/index?api-version=2023-11-01"
+        self.headers = {
+            "api-key": self.config["AZURE_SEARCH_API_PRIMARY_ADMIN_KEY"],
+            "Content-Type": "application/json",
+        }
+
+    def batches(self, docs: Iterable[Dict[str, Any]]) -> Iterator[List[bytes]]:
+        """Serialize docs once and group them under the count and byte limits."""
+        envelope = len(b'{"value":[]}')
+        batch: List[bytes] = []
+        size = envelope
+
+        for doc in docs:
+            encoded = json.dumps(doc, separators=(",", ":")).encode("utf-8")
+            if envelope + len(encoded) > self.max_batch_bytes:
+                raise ValueError(
+                    f"Document {doc.get(self.key_field)!r} is {len(encoded)} bytes, "
+                    f"over the {self.max_batch_bytes} byte batch limit"
+                )
+
+            if batch and (
+                len(batch) >= self.max_batch_docs
+                or size + len(encoded) + 1 > self.max_batch_bytes
+            ):
+                yield batch
+                batch, size = [], envelope
+
+            batch.append(encoded)
+            size += len(encoded) + 1  # separator
+
+        if batch:
+            yield batch
+
+    def upload(self, docs: Iterable[Dict[str, Any]]) -> AzureSearchUploadResult:
+        """Upload `docs`, which may be a stream: batches are serialized as they are
+        sent, with at most `concurrency` in flight."""
+        result: AzureSearchUploadResult = {"succeeded": 0, "batches": 0, "failed": []}
+
+        def collect(future) -> None:
+            succeeded, failed = future.result()
+            result["batches"] += 1
+            result["succeeded"] += succeeded
+            result["failed"].extend(failed)
+
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="search-upload"
+        ) as executor:
+            in_flight = deque()
+            for batch in self.batches(docs):
+                in_flight.append(executor.submit(self._send, batch))
+                if len(in_flight) >= self.concurrency:
+                    collect(in_flight.popleft())
+
+            while in_flight:
+                collect(in_flight.popleft())
+
+        return result
+
+    def _backoff(self, attempt: int, response=None) -> None:
+        delay = backoff_delay(
+            attempt,
+            self.backoff_base,
+            self.backoff_max,
+            parse_retry_after(response.headers if response is not None else None),
+        )
+        if response is not None and response.status_code == 429:
+            self.limiter.pause(delay)
+
+        time.sleep(delay)
+
+    def _send(self, batch: List[bytes]) -> tuple[int, List[AzureSearchUploadFailure]]:
+        """Send one batch; returns (succeeded count, permanently failed docs)."""
+        pending = {
+            str(json.loads(encoded)[self.key_field]): encoded for encoded in batch
+        }
+        succeeded = 0
+        failed: Dict[str, AzureSearchUploadFailure] = {}
+
+        for attempt in range(self.max_retries + 1):
+            body = b'{"value":[' + b",".join(pending.values()) + b"]}"
+            self.limiter.acquire()
+            try:
+                r = get_http_transport().post(
+                    url=self.url, headers=self.headers, data=body
+                )
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise RuntimeError(f"Upload failed: {e}") from e
+                self._backoff(attempt)
+                continue
+
+            if r.status_code == 413 and len(pending) > 1:
+                # payload too large for the service: split and send halves
+                encoded = list(pending.values())
+                half = len(encoded) // 2
+                for part in (encoded[:half], encoded[half:]):
+                    ok, bad = self._send(part)
+                    succeeded += ok
+                    failed.update({f["key"]: f for f in bad})
+                return succeeded, list(failed.values())
+
+            if r.status_code in (429, 503) or r.status_code >= 500:
+                if attempt == self.max_retries:
+                    break
+                self._backoff(attempt, r)
+                continue
+
+            if r.status_code >= 400 and r.status_code != 207:
+                raise RuntimeError(f"Ingestion failed: {r.status_code}, {r.text}")
+
+            retry = {}
+            for item in r.json().get("value", []):
+                key = str(item.get("key"))
+                if key not in pending:
+                    continue
+
+                if item.get("status"):
+                    succeeded += 1
+                    failed.pop(key, None)
+                    continue
+
+                failed[key] = {
+                    "key": key,
+                    "statusCode": item.get("statusCode"),
+                    "errorMessage": item.get("errorMessage"),
+                }
+                if item.get("statusCode") in _RETRIABLE_STATUS:
+                    retry[key] = pending[key]
+
+            pending = retry
+            if not pending:
+                break
+
+            if attempt < self.max_retries:
+                print(f"Retrying {len(pending)} failed document(s)")
+                self._backoff(attempt, r)
+
+        for key in pending:
+            failed.setdefault(
+                key,
+                {"key": key, "statusCode": None, "errorMessage": "retries exhausted"},
+            )
+
+        return succeeded, list(failed.values())
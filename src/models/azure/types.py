@@ -4,13 +4,18 @@ from typing import TypedDict, Optional
 class AzureSearchParams(TypedDict):
     query: str
     top: Optional[int]
-    use_vector: Optional[bool]
+    use_vectors: Optional[bool]
+    hybrid: Optional[bool]
+    select: Optional[str]
+    filter: Optional[str]
+    orderby: Optional[str]
 
 
 class AzureOpenAIGeneratePromptParams(TypedDict):
     instructions: Optional[str]
     query: str
-    context_docs: list[str]
+    context_docs: list[dict]
+    context_max_tokens: Optional[int]
 
 
 class AzureOpenAIGenerateMessageContent(TypedDict):
@@ -28,3 +33,16 @@ class AzureOpenAIGenerateParams(TypedDict):
     max_tokens: Optional[int]
     temperature: Optional[float]
     top_p: Optional[float]
+    timeout: Optional[float]
+
+
+class AzureSearchUploadFailure(TypedDict):
+    key: str
+    statusCode: Optional[int]
+    errorMessage: Optional[str]
+
+
+class AzureSearchUploadResult(TypedDict):
+    succeeded: int
+    batches: int
+    failed: list[AzureSearchUploadFailure]
@@ -0,0 +1,4 @@
+from .rag_pipeline import RagPipeline
+from .types import GuardedSearchResult
+
+__all__ = ["GuardedSearchResult", "RagPipeline"]
@@ -0,0 +1,226 @@
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from globals import config
+from models.azure.azure_openai import AzureOpenAIModel
+from models.azure.types import AzureSearchParams
+from models.watson import WatsonXModel
+from .types import GuardedSearchResult
+
+# fields of the heading/summary/detailed index written by intermediate ingestion
+_HIERARCHY_SELECT = (
+    "id, doc_id, section_id, chunk_type, order, title, section_heading, content"
+)
+
+
+class RagPipeline:
+    _executor = ThreadPoolExecutor(
+        max_workers=config["RAG_PIPELINE_WORKERS"], thread_name_prefix="rag"
+    )
+
+    @staticmethod
+    def _overview_params(params: AzureSearchParams) -> AzureSearchParams:
+        return {
+            **params,
+            "filter": "chunk_type eq 'summary' or chunk_type eq 'heading'",
+            "select": _HIERARCHY_SELECT,
+        }
+
+    @staticmethod
+    def _winning_sections(overview: list[dict]) -> list[str]:
+        sections: list[str] = []
+        for doc in overview:
+            section = doc.get("section_id")
+            if section and section not in sections:
+                sections.append(section)
+        return sections[: config["HIERARCHICAL_SECTIONS"]]
+
+    @staticmethod
+    def _details_params(sections: list[str]) -> AzureSearchParams:
+        return {
+            "query": "*",
+            "top": config["HIERARCHICAL_MAX_CHUNKS"],
+            "filter": (
+                "chunk_type eq 'detailed' and "
+                f"search.in(section_id, '{'|'.join(sections)}', '|')"
+            ),
+            "orderby": "order asc",
+            "select": _HIERARCHY_SELECT,
+        }
+
+    @staticmethod
+    def _merge_hierarchy(
+        overview: list[dict], sections: list[str], details: list[dict]
+    ) -> list[dict]:
+        """Detailed chunks of the winning sections, best section first and in
+        reading order, scored like their section; then overview hits whose
+        section has no detailed chunks (e.g. document summaries)."""
+        score: dict = {}
+        for doc in overview:
+            score.setdefault(doc.get("section_id"), doc.get("@search.score"))
+
+        rank = {section: i for i, section in enumerate(sections)}
+        details = sorted(
+            details, key=lambda d: (rank[d["section_id"]], d.get("order") or 0)
+        )
+        covered = {d["section_id"] for d in details}
+
+        return [{**d, "@search.score": score[d["section_id"]]} for d in details] + [
+            d for d in overview if d.get("section_id") not in covered
+        ]
+
+    @staticmethod
+    def hierarchical_search(params: AzureSearchParams) -> list[dict]:
+        """Two-phase retrieval: match summary/heading chunks, then fetch the
+        detailed chunks of the best sections in one filtered, ordered request."""
+        overview = AzureOpenAIModel.azure_search(RagPipeline._overview_params(params))
+        sections = RagPipeline._winning_sections(overview)
+        if not sections:
+            return overview
+
+        details = AzureOpenAIModel.azure_search(RagPipeline._details_params(sections))
+        return RagPipeline._merge_hierarchy(overview, sections, details)
+
+    @staticmethod
+    async def async_hierarchical_search(params: AzureSearchParams) -> list[dict]:
+        """Async hierarchical_search."""
+        overview = await AzureOpenAIModel.async_azure_search(
+            RagPipeline._overview_params(params)
+        )
+        sections = RagPipeline._winning_sections(overview)
+        if not sections:
+            return overview
+
+        details = await AzureOpenAIModel.async_azure_search(
+            RagPipeline._details_params(sections)
+        )
+        return RagPipeline._merge_hierarchy(overview, sections, details)
+
+    @staticmethod
+    def _fused_params(params: AzureSearchParams) -> list[AzureSearchParams]:
+        """Keyword and vector-only rankings of the query, in the order of
+        SEARCH_FUSION_WEIGHTS."""
+        return [
+            {**params, "use_vectors": False},
+            {**params, "use_vectors": True, "hybrid": False},
+        ]
+
+    @staticmethod
+    def fused_search(params: AzureSearchParams) -> list[dict]:
+        """Keyword and vector searches run concurrently, fused client-side with
+        weighted reciprocal rank fusion."""
+        return AzureOpenAIModel.azure_search_fused(
+            RagPipeline._fused_params(params), config["SEARCH_FUSION_WEIGHTS"]
+        )
+
+    @staticmethod
+    async def async_fused_search(params: AzureSearchParams) -> list[dict]:
+        """Async fused_search."""
+        return await AzureOpenAIModel.async_azure_search_fused(
+            RagPipeline._fused_params(params), config["SEARCH_FUSION_WEIGHTS"]
+        )
+
+    @staticmethod
+    def retrieve(params: AzureSearchParams) -> list[dict]:
+        """Flat search, or hierarchical/fused per RETRIEVAL_MODE."""
+        if config["RETRIEVAL_MODE"] == "hierarchical":
+            return RagPipeline.hierarchical_search(params)
+        if config["RETRIEVAL_MODE"] == "fused":
+            return RagPipeline.fused_search(params)
+        return AzureOpenAIModel.azure_search(params)
+
+    @staticmethod
+    async def async_retrieve(params: AzureSearchParams) -> list[dict]:
+        """Async retrieve."""
+        if config["RETRIEVAL_MODE"] == "hierarchical":
+            return await RagPipeline.async_hierarchical_search(params)
+        if config["RETRIEVAL_MODE"] == "fused":
+            return await RagPipeline.async_fused_search(params)
+        return await AzureOpenAIModel.async_azure_search(params)
+
+    @staticmethod
+    def start_search(params: AzureSearchParams) -> Future:
+        """Start retrieval in the background and return its future."""
+        return RagPipeline._executor.submit(RagPipeline.retrieve, params)
+
+    @staticmethod
+    def start_async_search(params: AzureSearchParams) -> asyncio.Task:
+        """Start async retrieval as a task on the running loop."""
+        task = asyncio.ensure_future(RagPipeline.async_retrieve(params))
+        # retrieve the exception of discarded tasks so it is not reported as unhandled
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    @staticmethod
+    def guarded_search(params: AzureSearchParams) -> GuardedSearchResult:
+        """Run guardrails and retrieval concurrently; retrieval is discarded if unsafe.
+
+        Latency is max(guardrails, retrieval) instead of their sum for safe queries.
+        """
+        t0 = time.time()
+        search = RagPipeline.start_search(params)
+
+        try:
+            verdict = WatsonXModel.guardrails_check(
+                [
+                    {
+                        "role": "user",
+                        "content": [{"type": "text", "text": params["query"]}],
+                    }
+                ]
+            )
+        except Exception:
+            search.cancel()
+            raise
+
+        is_unsafe = "unsafe" in verdict.lower()
+
+        if is_unsafe:
+            # cancels if not yet started; otherwise the result is simply dropped
+            search.cancel()
+            docs = []
+        else:
+            docs = search.result()
+
+        return {
+            "guardrails": verdict,
+            "is_unsafe": is_unsafe,
+            "docs": docs,
+            "elapsed_ms": round((time.time() - t0) * 1000, 1),
+        }
+
+    @staticmethod
+    async def async_guarded_search(params: AzureSearchParams) -> GuardedSearchResult:
+        """Async guarded_search: both calls run on the event loop, the search is
+        cancelled if the verdict is unsafe."""
+        t0 = time.time()
+        search = RagPipeline.start_async_search(params)
+
+        try:
+            verdict = await WatsonXModel.async_guardrails_check(
+                [
+                    {
+                        "role": "user",
+                        "content": [{"type": "text", "text": params["query"]}],
+                    }
+                ]
+            )
+        except Exception:
+            search.cancel()
+            raise
+
+        is_unsafe = "unsafe" in verdict.lower()
+
+        if is_unsafe:
+            search.cancel()
+            docs = []
+        else:
+            docs = await search
+
+        return {
+            "guardrails": verdict,
+            "is_unsafe": is_unsafe,
+            "docs": docs,
+            "elapsed_ms": round((time.time() - t0) * 1000, 1),
+        }
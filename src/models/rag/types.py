@@ -0,0 +1,8 @@
+from typing import TypedDict
+
+
+class GuardedSearchResult(TypedDict):
+    guardrails: str
+    is_unsafe: bool
+    docs: list[dict]
+    elapsed_ms: float
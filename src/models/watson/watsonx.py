@@ -1,11 +1,27 @@
+import asyncio
+import hashlib
+import json
+from functools import partial
+from typing import Hashable, Optional
+
 from ibm_watsonx_ai import Credentials
 from ibm_watsonx_ai.foundation_models import ModelInference
 
 from globals import config, Config
+from utils.cache import TTLCache, normalize_text
+from utils.ratelimit import RateLimiter
+from utils.registry import client_registry
+from utils.retry import RetryPolicy
 from .types import WatsonInferenceModelMessage
 
 
 class WatsonXModel:
+    verdict_cache = TTLCache(
+        maxsize=config["GUARDRAILS_CACHE_MAX_SIZE"],
+        ttl=config["GUARDRAILS_CACHE_TTL"],
+    )
+    retry = RetryPolicy(RateLimiter(rpm=config["WATSONX_RPM"]))
+
     @staticmethod
     def get_credentials(config: Config):
         return Credentials(
@@ -14,12 +30,50 @@ class WatsonXModel:
 
     @staticmethod
     def get_inference_model(model: str = "meta-llama/llama-guard-3-11b-vision"):
-        return ModelInference(
-            model_id=model,
-            credentials=WatsonXModel.get_credentials(config),
-            project_id=config["WATSONX_PROJECT_ID"],
+        """Shared ModelInference per model id; the IAM token exchange happens once per process."""
+        return client_registry.get_or_create(
+            ("watsonx", config["WATSONX_API_URL"], config["WATSONX_PROJECT_ID"], model),
+            lambda: ModelInference(
+                model_id=model,
+                credentials=WatsonXModel.get_credentials(config),
+                project_id=config["WATSONX_PROJECT_ID"],
+            ),
+            lambda inference: inference.close_persistent_connection(),
         )
 
+    @staticmethod
+    def verdict_cache_key(
+        model: str, messages: list[WatsonInferenceModelMessage]
+    ) -> Optional[Hashable]:
+        """Cache key for a guardrails verdict, or None if the messages must not be cached."""
+        parts = []
+        for message in messages:
+            content = message.get("content")
+            if isinstance(content, str):
+                content = [{"type": "text", "text": content}]
+
+            for item in content:
+                if item.get("type") == "text":
+                    parts.append((message.get("role"), normalize_text(item["text"])))
+                elif config["GUARDRAILS_CACHE_IMAGES"]:
+                    digest = hashlib.sha256(
+                        json.dumps(item, sort_keys=True).encode("utf-8")
+                    ).hexdigest()
+                    parts.append((message.get("role"), digest))
+                else:
+                    return None
+
+        return (model, tuple(parts))
+
+    @staticmethod
+    def _parse_guardrails_response(model: str, response: dict) -> str:
+        parsed_response = response["choices"][0]["message"]["content"].strip() or ""
+
+        if model == "ibm/granite-guardian-3-8b":
+            return "safe" if parsed_response.lower() == "no" else "unsafe"
+
+        return parsed_response if parsed_response else "unsafe"
+
     @staticmethod
     def guardrails_check(messages: list[WatsonInferenceModelMessage]) -> str:
         """Run WatsonX guardrails to classify a basic text query."""
@@ -29,21 +83,121 @@ class WatsonXModel:
 
         model = "ibm/granite-guardian-3-8b"
 
-        response = WatsonXModel.get_inference_model(model).chat(messages=messages)
+        key = WatsonXModel.verdict_cache_key(model, messages)
+        if key is not None:
+            cached = WatsonXModel.verdict_cache.get(key)
+            if cached is not None:
+                return cached
 
-        parsed_response = response["choices"][0]["message"]["content"].strip() or ""
+        response = WatsonXModel.retry.call(
+            partial(WatsonXModel.get_inference_model(model).chat, messages=messages),
+            idempotent=False,
+        )
+        verdict = WatsonXModel._parse_guardrails_response(model, response)
 
-        if model == "ibm/granite-guardian-3-8b":
-            return "safe" if parsed_response.lower() == "no" else "unsafe"
+        if key is not None:
+            WatsonXModel.verdict_cache.set(key, verdict)
 
-        return parsed_response if parsed_response else "unsafe"
+        return verdict
+
+    @staticmethod
+    async def async_guardrails_check(
+        messages: list[WatsonInferenceModelMessage],
+    ) -> str:
+        """Async guardrails_check. ModelInference has no async chat in this SDK version,
+        so the chat call runs on a worker thread to keep the event loop free."""
+
+        if "watsonx" in config.get("BYPASS", []):
+            return "safe"
+
+        model = "ibm/granite-guardian-3-8b"
+
+        key = WatsonXModel.verdict_cache_key(model, messages)
+        if key is not None:
+            cached = WatsonXModel.verdict_cache.get(key)
+            if cached is not None:
+                return cached
+
+        inference = await asyncio.to_thread(WatsonXModel.get_inference_model, model)
+        response = await asyncio.to_thread(
+            WatsonXModel.retry.call,
+            partial(inference.chat, messages=messages),
+            idempotent=False,
+        )
+        verdict = WatsonXModel._parse_guardrails_response(model, response)
+
+        if key is not None:
+            WatsonXModel.verdict_cache.set(key, verdict)
+
+        return verdict
+
+    @staticmethod
+    def _parse_generated_text(raw_response) -> str:
+        if isinstance(raw_response, dict):
+            result = (
+                raw_response.get("results", [{}])[0].get("generated_text", "").strip()
+            )
+        else:
+            result = str(raw_response).strip()
+
+        return result.lower()
 
     @staticmethod
     def custom_guardrails_check(query: str) -> str:
         if "watsonx" in config.get("BYPASS", []):
             return "safe"
 
-        classification_prompt = f"""
+        model = "ibm/granite-3-3-8b-instruct"
+
+        key = (model, normalize_text(query))
+        cached = WatsonXModel.verdict_cache.get(key)
+        if cached is not None:
+            return cached
+
+        raw_response = WatsonXModel.retry.call(
+            partial(
+                WatsonXModel.get_inference_model(model).generate_text,
+                prompt=WatsonXModel.custom_guardrails_prompt(query),
+            ),
+            idempotent=False,
+        )
+        result = WatsonXModel._parse_generated_text(raw_response)
+
+        WatsonXModel.verdict_cache.set(key, result)
+
+        return result
+
+    @staticmethod
+    async def async_custom_guardrails_check(query: str) -> str:
+        """Async custom_guardrails_check using ModelInference.agenerate."""
+        if "watsonx" in config.get("BYPASS", []):
+            return "safe"
+
+        model = "ibm/granite-3-3-8b-instruct"
+
+        key = (model, normalize_text(query))
+        cached = WatsonXModel.verdict_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # the first call per model does a blocking IAM token exchange
+        inference = await asyncio.to_thread(WatsonXModel.get_inference_model, model)
+        raw_response = await WatsonXModel.retry.acall(
+            partial(
+                inference.agenerate,
+                prompt=WatsonXModel.custom_guardrails_prompt(query),
+            ),
+            idempotent=False,
+        )
+        result = WatsonXModel._parse_generated_text(raw_response)
+
+        WatsonXModel.verdict_cache.set(key, result)
+
+        return result
+
+    @staticmethod
+    def custom_guardrails_prompt(query: str) -> str:
+        return f"""
             Classify the following user query as 'safe' or 'unsafe'.
 
             Definition of 'unsafe':
@@ -91,16 +245,3 @@ class WatsonXModel:
             User: "{query}"
             Answer:
         """
-
-        raw_response = WatsonXModel.get_inference_model(
-            "ibm/granite-3-3-8b-instruct"
-        ).generate_text(prompt=classification_prompt)
-
-        if isinstance(raw_response, dict):
-            result = (
-                raw_response.get("results", [{}])[0].get("generated_text", "").strip()
-            )
-        else:
-            result = str(raw_response).strip()
-
-        return result.lower()
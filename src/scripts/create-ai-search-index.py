@@ -1,7 +1,9 @@
-import requests
 import json
 from pprint import pprint
 
+from utils.http import get_http_transport
+from utils.index_version import bump_index_version
+
 
 def main(config):
     url = f"{config["AZURE_SEARCH_API_URL"]}/indexes/{config["AZURE_SEARCH_API_INDEX"]}?api-version=2023-11-01"
@@ -26,11 +28,15 @@ def main(config):
     }
 
     try:
-        response = requests.put(url, headers=headers, data=json.dumps(index_schema))
+        response = get_http_transport().put(
+            url, headers=headers, data=json.dumps(index_schema)
+        )
 
         if response.status_code >= 400:
             pprint(vars(response))
         else:
+            # a recreated index has new contents; drop results cached for the old one
+            bump_index_version(config["AZURE_SEARCH_API_INDEX"])
             print("Index created or updated:", response.json())
     except Exception as e:
         print(f"Error: {e}")
@@ -1,6 +1,8 @@
-import requests
 from pprint import pprint
 
+from utils.http import get_http_transport
+from utils.index_version import bump_index_version
+
 
 def main(config):
     url = f"{config['AZURE_SEARCH_API_URL']}/indexes/{config['AZURE_SEARCH_API_INDEX']}?api-version=2023-11-01"
@@ -11,9 +13,10 @@ def main(config):
     }
 
     try:
-        response = requests.delete(url, headers=headers)
+        response = get_http_transport().delete(url, headers=headers)
 
         if response.status_code == 204:
+            bump_index_version(config["AZURE_SEARCH_API_INDEX"])
             print(f"Index '{config['AZURE_SEARCH_API_INDEX']}' deleted successfully.")
         elif response.status_code == 404:
             print(f"Index '{config['AZURE_SEARCH_API_INDEX']}' not found.")
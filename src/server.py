@@ -0,0 +1,304 @@
+import asyncio
+import json
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from aiohttp import WSMsgType, web
+
+from globals import config
+from models.azure import AzureAgentModel
+from utils.registry import client_registry
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, default=str, ensure_ascii=False)
+
+
+class Overloaded(Exception):
+    pass
+
+
+class ChatSession:
+    """One conversation: its own agent, so chat history and trace are not shared."""
+
+    def __init__(self, session_id: str, agent: AzureAgentModel) -> None:
+        self.id = session_id
+        self.agent = agent
+        # turns of one session run one at a time, in arrival order
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+
+class ChatServer:
+    """Multi-session chat over HTTP (JSON or server-sent events) and WebSocket.
+
+    - Sessions share one chat service and the process-wide pooled clients.
+    - At most `max_turns` agent turns run at once. Up to `max_pending` more
+      may wait; beyond that requests get 503 with Retry-After.
+    - Streamed deltas are written with backpressure: each write waits for the
+      socket to drain, so a slow client slows its own turn instead of
+      buffering it in memory.
+    - Sessions idle for `session_ttl` seconds are dropped.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_sessions: int,
+        session_ttl: float,
+        max_turns: int,
+        max_pending: int,
+        max_message_chars: int,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.max_pending = max_pending
+        self.max_message_chars = max_message_chars
+
+        self.sessions: Dict[str, ChatSession] = {}
+        self.slots = asyncio.Semaphore(max_turns)
+        self.active = 0
+        self.pending = 0
+        self.service = None
+        self._reaper: Optional[asyncio.Task] = None
+
+    # --------------------------
+    # Lifecycle
+    # --------------------------
+
+    async def on_startup(self, app: web.Application) -> None:
+        # created on the server loop so its HTTP client is bound to it
+        self.service = AzureAgentModel.create_service(config)
+        self._reaper = asyncio.create_task(self._reap())
+
+    async def on_cleanup(self, app: web.Application) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+        self.sessions.clear()
+
+        client = getattr(self.service, "client", None)
+        if client is not None:
+            await client.close()
+        await client_registry.aclose_loop()
+
+    async def _reap(self) -> None:
+        while True:
+            await asyncio.sleep(min(60.0, self.session_ttl))
+            cutoff = time.monotonic() - self.session_ttl
+            for session in list(self.sessions.values()):
+                if session.last_used < cutoff and not session.lock.locked():
+                    self.sessions.pop(session.id, None)
+
+    # --------------------------
+    # Sessions and admission
+    # --------------------------
+
+    def create_session(self) -> ChatSession:
+        if len(self.sessions) >= self.max_sessions:
+            idle = [s for s in self.sessions.values() if not s.lock.locked()]
+            if not idle:
+                raise Overloaded()
+            oldest = min(idle, key=lambda s: s.last_used)
+            self.sessions.pop(oldest.id, None)
+
+        session = ChatSession(
+            uuid.uuid4().hex,
+            AzureAgentModel(config, max_tokens=8192, service=self.service),
+        )
+        self.sessions[session.id] = session
+        return session
+
+    def get_session(self, request: web.Request) -> ChatSession:
+        session = self.sessions.get(request.match_info["session_id"])
+        if session is None:
+            raise web.HTTPNotFound(
+                text=_dumps({"error": "unknown session"}),
+                content_type="application/json",
+            )
+        return session
+
+    @asynccontextmanager
+    async def turn(self, session: ChatSession):
+        if self.pending >= self.max_pending:
+            raise Overloaded()
+
+        self.pending += 1
+        waiting = True
+        try:
+            async with session.lock, self.slots:
+                self.pending -= 1
+                waiting = False
+                self.active += 1
+                try:
+                    yield
+                finally:
+                    self.active -= 1
+        finally:
+            if waiting:
+                self.pending -= 1
+            session.last_used = time.monotonic()
+
+    def _message(self, body: Any) -> str:
+        message = body.get("message") if isinstance(body, dict) else None
+        if not isinstance(message, str) or not message.strip():
+            raise ValueError("'message' must be a non-empty string")
+        if len(message) > self.max_message_chars:
+            raise ValueError(f"'message' exceeds {self.max_message_chars} characters")
+        return message
+
+    # --------------------------
+    # Handlers
+    # --------------------------
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "sessions": len(self.sessions),
+                "active_turns": self.active,
+                "pending_turns": self.pending,
+            }
+        )
+
+    async def post_session(self, request: web.Request) -> web.Response:
+        try:
+            session = self.create_session()
+        except Overloaded:
+            return _overloaded()
+        return web.json_response({"session_id": session.id}, status=201)
+
+    async def delete_session(self, request: web.Request) -> web.Response:
+        self.sessions.pop(request.match_info["session_id"], None)
+        return web.Response(status=204)
+
+    async def post_message(self, request: web.Request) -> web.StreamResponse:
+        session = self.get_session(request)
+        try:
+            body = await request.json()
+            message = self._message(body)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400, dumps=_dumps)
+
+        if body.get("stream"):
+            return await self._stream_sse(request, session, message)
+
+        try:
+            async with self.turn(session):
+                answer, trace = await session.agent.async_ask(message)
+        except Overloaded:
+            return _overloaded()
+
+        return web.json_response({"answer": answer, "trace": trace}, dumps=_dumps)
+
+    async def _stream_sse(
+        self, request: web.Request, session: ChatSession, message: str
+    ) -> web.StreamResponse:
+        try:
+            async with self.turn(session):
+                response = web.StreamResponse(
+                    headers={
+                        "Content-Type": "text/event-stream",
+                        "Cache-Control": "no-cache",
+                    }
+                )
+                await response.prepare(request)
+
+                stream = session.agent.async_ask_stream(message)
+                deltas = aiter(stream)
+                try:
+                    async for delta in deltas:
+                        await response.write(
+                            f"data: {_dumps({'delta': delta})}\n\n".encode()
+                        )
+                finally:
+                    # stops the agent run if the client went away mid-stream
+                    await deltas.aclose()
+
+                await response.write(
+                    f"event: done\ndata: {_dumps({'answer': stream.text, 'trace': stream.trace})}\n\n".encode()
+                )
+                await response.write_eof()
+                return response
+        except Overloaded:
+            return _overloaded()
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        session = self.get_session(request)
+        ws = web.WebSocketResponse(
+            heartbeat=30, max_msg_size=self.max_message_chars * 4
+        )
+        await ws.prepare(request)
+
+        # one turn at a time per connection: the next message is read only once
+        # the previous answer has been sent
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+
+            try:
+                message = self._message(json.loads(msg.data))
+            except ValueError as e:
+                await ws.send_str(_dumps({"type": "error", "error": str(e)}))
+                continue
+
+            try:
+                async with self.turn(session):
+                    stream = session.agent.async_ask_stream(message)
+                    async for delta in stream:
+                        await ws.send_str(_dumps({"type": "delta", "text": delta}))
+                    await ws.send_str(
+                        _dumps(
+                            {
+                                "type": "done",
+                                "answer": stream.text,
+                                "trace": stream.trace,
+                            }
+                        )
+                    )
+            except Overloaded:
+                await ws.send_str(
+                    _dumps({"type": "error", "error": "overloaded", "retry_after": 1})
+                )
+
+        return ws
+
+
+def _overloaded() -> web.Response:
+    return web.json_response(
+        {"error": "overloaded"}, status=503, headers={"Retry-After": "1"}
+    )
+
+
+def create_app() -> web.Application:
+    server = ChatServer(
+        max_sessions=config["CHAT_MAX_SESSIONS"],
+        session_ttl=config["CHAT_SESSION_TTL"],
+        max_turns=config["CHAT_MAX_CONCURRENT_TURNS"],
+        max_pending=config["CHAT_MAX_PENDING_TURNS"],
+        max_message_chars=config["CHAT_MAX_MESSAGE_CHARS"],
+    )
+
+    app = web.Application(client_max_size=config["CHAT_MAX_MESSAGE_CHARS"] * 4 + 1024)
+    app.on_startup.append(server.on_startup)
+    app.on_cleanup.append(server.on_cleanup)
+    app.add_routes(
+        [
+            web.get("/health", server.health),
+            web.post("/sessions", server.post_session),
+            web.delete("/sessions/{session_id}", server.delete_session),
+            web.post("/sessions/{session_id}/messages", server.post_message),
+            web.get("/sessions/{session_id}/ws", server.websocket),
+        ]
+    )
+    return app
+
+
+def main() -> None:
+    web.run_app(
+        create_app(), host=config["CHAT_SERVER_HOST"], port=config["CHAT_SERVER_PORT"]
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -78,9 +78,9 @@ class Tools:
         self.logger = logger
 
     @kernel_function(description="Guardrails check: returns 'safe' or 'unsafe'")
-    def guardrails_check(self, q: Annotated[str, "User query"]) -> str:
+    async def guardrails_check(self, q: Annotated[str, "User query"]) -> str:
         t = time.time()
-        r = WatsonXModel.guardrails_check(
+        r = await WatsonXModel.async_guardrails_check(
             [{"role": "user", "content": [{"type": "text", "text": q}]}]
         )
         out = "unsafe" if "unsafe" in r.lower() else "safe"
@@ -90,9 +90,11 @@ class Tools:
     @kernel_function(
         description="Vector search over indexed docs; returns JSON list of docs"
     )
-    def search_docs(self, q: Annotated[str, "User query"]) -> str:
+    async def search_docs(self, q: Annotated[str, "User query"]) -> str:
         t = time.time()
-        docs = AzureOpenAIModel.azure_search({"query": q, "use_vectors": True})
+        docs = await AzureOpenAIModel.async_azure_search(
+            {"query": q, "use_vectors": True}
+        )
         # log a compact preview
         preview = {"count": len(docs)}
         if docs:
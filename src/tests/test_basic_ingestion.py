@@ -1,10 +1,20 @@
 import time
 import json
-import pathlib
-import requests
-import tiktoken
+import itertools
 
-from models.azure import AzureOpenAIModel
+from models.azure import AzureOpenAIModel, AzureSearchUploader
+from utils.chunking import TokenChunker
+from utils.embedding_cache import get_embedding_cache
+from utils.http import get_http_transport
+from utils.index_version import bump_index_version
+from utils.ingestion import IngestionPipeline
+from utils.load import iter_docs_from_folder
+from utils.local_search import get_local_search_index
+from utils.manifest import get_ingestion_manifest
+from utils.semantic_chunking import get_semantic_chunker
+
+# manifest tag; changing chunking or schema here forces a full rebuild
+PIPELINE = "basic:offsets-500/50"
 
 
 def delete_index_if_exists(config):
@@ -15,13 +25,13 @@ def delete_index_if_exists(config):
         "Content-Type": "application/json",
     }
 
-    r = requests.delete(url, headers=headers)
+    r = get_http_transport().delete(url, headers=headers)
     if r.status_code in (200, 204):
         print(
             f"🗑️ Deleted existing index '{config['AZURE_SEARCH_API_INDEX']}'. Waiting for confirmation..."
         )
         for _ in range(10):
-            check = requests.get(url, headers=headers)
+            check = get_http_transport().get(url, headers=headers)
             if check.status_code == 404:
                 print("✅ Index deletion confirmed.")
                 return
@@ -79,7 +89,7 @@ def create_hybrid_index(config, embedding_dim=1536):
         },
     }
 
-    r = requests.put(url, headers=headers, data=json.dumps(index_schema))
+    r = get_http_transport().put(url, headers=headers, data=json.dumps(index_schema))
     if r.status_code >= 400:
         raise RuntimeError(f"Index creation failed: {r.status_code}, {r.text}")
     print(
@@ -87,67 +97,94 @@ def create_hybrid_index(config, embedding_dim=1536):
     )
 
 
-def load_docs_from_folder(folder_path):
-    """Load all .txt files from docs/ folder."""
-    docs = []
-    for f in pathlib.Path(folder_path).glob("*.txt"):
-        with open(f, "r", encoding="utf-8") as fh:
-            docs.append({"title": f.stem, "content": fh.read()})
-    print(f"📄 Loaded {len(docs)} document(s) from '{folder_path}'.")
-    return docs
-
-
 def chunk_text(text, max_tokens=500, overlap=50):
     """Split text into overlapping chunks using token count."""
-    tokenizer = tiktoken.get_encoding("cl100k_base")
-    tokens = tokenizer.encode(text)
-    chunks, start = [], 0
-    while start < len(tokens):
-        end = min(start + max_tokens, len(tokens))
-        chunks.append(tokenizer.decode(tokens[start:end]))
-        start += max_tokens - overlap
-    return chunks
-
-
-def ingest_docs(config, docs):
-    """Chunk, embed, and upload documents to Azure Cognitive Search."""
-    url = f"{config['AZURE_SEARCH_API_URL']}/indexes/{config['AZURE_SEARCH_API_INDEX']}/docs/index?api-version=2023-11-01"
-    headers = {
-        "api-key": config["AZURE_SEARCH_API_PRIMARY_ADMIN_KEY"],
-        "Content-Type": "application/json",
-    }
-    upload_payload = []
+    return TokenChunker(max_tokens, overlap).chunk(text)
 
-    for doc_id, doc in enumerate(docs, start=1):
-        chunks = chunk_text(doc["content"])
-        for i, chunk in enumerate(chunks):
-            embedding = AzureOpenAIModel.azure_openai_generate_embedding(chunk)
 
-            print(f"Created embedding {embedding}")
-            upload_payload.append(
-                {
-                    "@search.action": "mergeOrUpload",
-                    "id": f"{doc_id}-{i}",
-                    "title": doc["title"],
-                    "content": chunk,
-                    "embedding": embedding,
-                }
-            )
+def index_exists(config):
+    url = f"{config['AZURE_SEARCH_API_URL']}/indexes/{config['AZURE_SEARCH_API_INDEX']}?api-version=2023-11-01"
+    headers = {"api-key": config["AZURE_SEARCH_API_PRIMARY_ADMIN_KEY"]}
 
-    r = requests.post(url, headers=headers, data=json.dumps({"value": upload_payload}))
+    r = get_http_transport().get(url, headers=headers)
+    if r.status_code == 404:
+        return False
     if r.status_code >= 400:
-        raise RuntimeError(f"Ingestion failed: {r.status_code}, {r.text}")
-    print(f"✅ Ingested {len(upload_payload)} chunks with embeddings.")
+        raise RuntimeError(f"Could not read index: {r.status_code}, {r.text}")
+    return True
 
 
-def main(config):
-    delete_index_if_exists(config)
-    create_hybrid_index(config)
+def pipeline_tag(config):
+    if config["INGESTION_CHUNKING"] != "semantic":
+        return PIPELINE
+    return (
+        f"basic:semantic-{config['SEMANTIC_CHUNK_MODE']}-"
+        f"{config['SEMANTIC_CHUNK_THRESHOLD']}/{config['SEMANTIC_CHUNK_PERCENTILE']}-"
+        f"{config['SEMANTIC_CHUNK_MAX_TOKENS']}"
+    )
 
-    docs = load_docs_from_folder("src/docs")
-    if not docs:
+
+def make_prepare_doc(config):
+    """Row builder for the configured chunking; ids are assigned by the pipeline."""
+    if config["INGESTION_CHUNKING"] == "semantic":
+        chunk = get_semantic_chunker(
+            AzureOpenAIModel.azure_openai_generate_embeddings
+        ).chunk
+    else:
+        chunk = chunk_text
+
+    def prepare_doc(doc):
+        return [
+            {
+                "@search.action": "mergeOrUpload",
+                "title": doc["title"],
+                "content": text,
+            }
+            for text in chunk(doc["content"])
+        ]
+
+    return prepare_doc
+
+
+def main(config):
+    manifest = get_ingestion_manifest(config["AZURE_SEARCH_API_INDEX"])
+
+    tag = pipeline_tag(config)
+
+    # BYPASS=azure_search_api ingests into the local in-process index instead
+    local = get_local_search_index() if "azure_search_api" in config["BYPASS"] else None
+    exists = local.exists() if local is not None else index_exists(config)
+
+    if config["INGESTION_FULL_REBUILD"] or manifest.pipeline != tag or not exists:
+        if local is not None:
+            local.clear()
+        else:
+            delete_index_if_exists(config)
+            create_hybrid_index(config)
+        manifest.reset(tag)
+        manifest.save()
+
+    docs = iter_docs_from_folder("src/docs", recursive=True)
+    first = next(docs, None)
+    if first is None:
         raise RuntimeError(
             "No documents found in ./docs — please add at least one .txt file."
         )
 
-    ingest_docs(config, docs)
+    pipeline = IngestionPipeline(
+        make_prepare_doc(config),
+        AzureOpenAIModel.azure_openai_generate_embeddings,
+        local.upload if local is not None else AzureSearchUploader(config).upload,
+        manifest=manifest,
+    )
+    stats = pipeline.run(itertools.chain([first], docs))
+    if stats["rows_uploaded"] or stats["stale_deleted"]:
+        # invalidates cached search results computed against the old contents
+        bump_index_version()
+    print(f"✅ Ingestion: {stats}")
+
+    print(f"HTTP transport: {get_http_transport().stats.snapshot()}")
+
+    cache = get_embedding_cache()
+    if cache is not None:
+        print(f"Embedding cache: {cache.stats()}")
@@ -1,5 +1,6 @@
 from models.watson import WatsonXModel
 from models.azure import AzureOpenAIModel
+from models.rag import RagPipeline
 
 
 def main(**_):
@@ -38,10 +39,14 @@ def main(**_):
         expected_guardrail = case["expected_guardrail"]
 
         print(f"\n=== Testing: {query} ===")
-        guardrails_result = WatsonXModel.guardrails_check(
-            [{"role": "user", "content": [{"type": "text", "text": query}]}]
-        )
-        is_unsafe = "unsafe" in guardrails_result.lower()
+        try:
+            result = RagPipeline.guarded_search({"query": query, "use_vectors": True})
+        except RuntimeError as e:
+            print(f"Azure search error '{e}'")
+            exit(1)
+
+        guardrails_result = result["guardrails"]
+        is_unsafe = result["is_unsafe"]
         print(f"Guardrails result: {repr(guardrails_result)}")
 
         if expected_guardrail == "unsafe" and not is_unsafe:
@@ -51,12 +56,12 @@ def main(**_):
             print("FAIL: Guardrails incorrectly blocked safe query.")
             all_passed = False
 
-        try:
-            docs = AzureOpenAIModel.azure_search({"query": query, "use_vectors": True})
-        except RuntimeError as e:
-            print(f"Azure search error '{e}'")
-            exit(1)
+        if is_unsafe:
+            if expected_guardrail == "unsafe":
+                print("PASS: Query blocked; retrieval result discarded.")
+            continue
 
+        docs = result["docs"]
         if not docs:
             print("FAIL: No documents retrieved.")
             all_passed = False
@@ -70,10 +75,7 @@ def main(**_):
                 "role": "system",
                 "content": (
                     "You are a helpful banking assistant. "
-                    "Answer using only the provided context. "
-                    f"Guardrails marked this query as {'unsafe' if is_unsafe else 'safe'}. "
-                    "If unsafe, do not provide disallowed information. "
-                    "Instead offer to help them with other services that are deemed safe."
+                    "Answer using only the provided context."
                 ),
             },
             {"role": "user", "content": prompt},
@@ -86,6 +88,10 @@ def main(**_):
             print("FAIL: Empty answer returned.")
             all_passed = False
 
+    print(f"\nQuery embedding cache: {AzureOpenAIModel.query_embedding_cache.stats()}")
+    print(f"Search result cache: {AzureOpenAIModel.search_cache.stats()}")
+    print(f"Guardrails verdict cache: {WatsonXModel.verdict_cache.stats()}")
+
     if all_passed:
         print("\n✅ All RAG tests passed!")
     else:
@@ -0,0 +1,69 @@
+import time
+
+from utils import iter_docs_from_folder
+from utils.chunking import TokenChunker
+from utils.tokens import get_encoding
+
+
+def decode_windows(text, max_tokens=500, overlap=50):
+    """The previous approach: encode, then decode every overlapping window."""
+    tokenizer = get_encoding()
+    tokens = tokenizer.encode(text, disallowed_special=())
+    chunks, start = [], 0
+    while start < len(tokens):
+        end = min(start + max_tokens, len(tokens))
+        chunks.append(tokenizer.decode(tokens[start:end]))
+        start += max_tokens - overlap
+    return chunks
+
+
+def bench(name, fn, total_tokens, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        chunks = fn()
+        best = min(best, time.perf_counter() - t0)
+
+    print(
+        f"{name:<28} {total_tokens / best:>14,.0f} tokens/s  "
+        f"({best * 1000:.1f} ms, {chunks} chunks)"
+    )
+
+
+def main(config):
+    docs = [doc["content"] for doc in iter_docs_from_folder("src/docs", recursive=True)]
+    if not docs:
+        raise RuntimeError("No documents found in ./docs.")
+
+    # a few hundred documents of mixed size, including multi-byte text
+    texts = [
+        (doc + "\n\nRésumé: déjà vu — 東京 😀.\n\n") * (1 + i % 8)
+        for i, doc in enumerate(docs * max(1, 200 // len(docs)))
+    ]
+
+    chunker = TokenChunker(500, 50)
+    total_tokens = sum(len(tokens) for tokens in chunker.encode_many(texts))
+    print(f"Corpus: {len(texts)} documents, {total_tokens:,} tokens")
+
+    bench(
+        "decode per window",
+        lambda: sum(len(decode_windows(text)) for text in texts),
+        total_tokens,
+    )
+    bench(
+        "offsets, one at a time",
+        lambda: sum(len(chunker.chunk(text)) for text in texts),
+        total_tokens,
+    )
+    bench(
+        "offsets, batch encoded",
+        lambda: sum(len(chunks) for chunks in chunker.chunk_many(texts)),
+        total_tokens,
+    )
+
+    snapping = TokenChunker(500, 50, snap_to_sentences=True)
+    bench(
+        "offsets + sentence snapping",
+        lambda: sum(len(chunks) for chunks in snapping.chunk_many(texts)),
+        total_tokens,
+    )
@@ -2,12 +2,28 @@
 import re
 import json
 import time
-import pathlib
-import requests
-import tiktoken
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
 
-from models.azure import AzureOpenAIModel
+from globals import config
+from models.azure import AzureOpenAIModel, AzureSearchUploader
+from utils.chunking import TokenChunker
+from utils.embedding_cache import get_embedding_cache
+from utils.http import get_http_transport
+from utils.index_version import bump_index_version
+from utils.ingestion import IngestionPipeline
+from utils.load import iter_docs_from_folder
+from utils.local_search import get_local_search_index
+from utils.manifest import get_ingestion_manifest, stable_id
+
+# manifest tag; changing sectioning, chunking or schema here forces a full rebuild
+PIPELINE = "intermediate:offsets-600/60"
+
+# shared by every document being prepared, so it caps total in-flight LLM calls
+_llm_pool = ThreadPoolExecutor(
+    max_workers=config["INGESTION_LLM_CONCURRENCY"], thread_name_prefix="llm"
+)
 
 
 # --------------------------
@@ -21,13 +37,13 @@ def delete_index_if_exists(config):
         "api-key": config["AZURE_SEARCH_API_PRIMARY_ADMIN_KEY"],
         "Content-Type": "application/json",
     }
-    r = requests.delete(url, headers=headers)
+    r = get_http_transport().delete(url, headers=headers)
     if r.status_code in (200, 204):
         print(
             f"Deleted '{config['AZURE_SEARCH_API_INDEX']}'. Waiting for confirmation..."
         )
         for _ in range(10):
-            if requests.get(url, headers=headers).status_code == 404:
+            if get_http_transport().get(url, headers=headers).status_code == 404:
                 print("Index deletion confirmed.")
                 return
             time.sleep(1)
@@ -97,40 +113,32 @@ def create_hybrid_index(config, embedding_dim=1536):
             "profiles": [{"name": "default-hnsw-profile", "algorithm": "default-hnsw"}],
         },
     }
-    r = requests.put(url, headers=headers, data=json.dumps(index_schema))
+    r = get_http_transport().put(url, headers=headers, data=json.dumps(index_schema))
     if r.status_code >= 400:
         raise RuntimeError(f"Index creation failed: {r.status_code}, {r.text}")
     print(f"Created hybrid index '{config['AZURE_SEARCH_API_INDEX']}'.")
 
 
-# --------------------------
-# Loading + splitting
-# --------------------------
-
+def index_exists(config) -> bool:
+    url = f"{config['AZURE_SEARCH_API_URL']}/indexes/{config['AZURE_SEARCH_API_INDEX']}?api-version=2023-11-01"
+    headers = {"api-key": config["AZURE_SEARCH_API_PRIMARY_ADMIN_KEY"]}
 
-def load_docs_from_folder(folder_path: str) -> List[Dict[str, str]]:
-    docs = []
-    for f in pathlib.Path(folder_path).glob("*.txt"):
-        with open(f, "r", encoding="utf-8") as fh:
-            docs.append({"title": f.stem, "content": fh.read()})
-    print(f"Loaded {len(docs)} document(s) from '{folder_path}'.")
-    return docs
+    r = get_http_transport().get(url, headers=headers)
+    if r.status_code == 404:
+        return False
+    if r.status_code >= 400:
+        raise RuntimeError(f"Could not read index: {r.status_code}, {r.text}")
+    return True
 
 
-def _tokenizer():
-    return tiktoken.get_encoding("cl100k_base")
+# --------------------------
+# Splitting
+# --------------------------
 
 
-def chunk_by_tokens(text: str, max_tokens=600, overlap=60) -> List[str]:
-    tok = _tokenizer()
-    ids = tok.encode(text)
-    chunks, start = [], 0
-    step = max_tokens - overlap if max_tokens > overlap else max_tokens
-    while start < len(ids):
-        end = min(start + max_tokens, len(ids))
-        chunks.append(tok.decode(ids[start:end]))
-        start += step
-    return chunks
+def chunk_sections(bodies: List[str], max_tokens=600, overlap=60) -> List[List[str]]:
+    """Token-chunk every section body of a document in one batch."""
+    return TokenChunker(max_tokens, overlap).chunk_many(bodies)
 
 
 # --------------------------
@@ -180,6 +188,11 @@ def heuristic_section_document(text: str) -> List[Dict[str, str]]:
     return sections
 
 
+def heuristic_summary(text: str, max_chars: int = 300) -> str:
+    sentences = re.split(r"(?<=[.!?])\s+", " ".join(text.split()))
+    return " ".join(sentences[:2])[:max_chars]
+
+
 def best_effort_heading(raw_heading: str, content: str, fallback: str) -> str:
     if raw_heading and raw_heading.strip():
         return raw_heading.strip()
@@ -207,8 +220,10 @@ def llm_section_document(text: str) -> List[Dict[str, str]]:
         },
         {"role": "user", "content": text},
     ]
-    raw = AzureOpenAIModel.azure_openai_generate({"messages": messages})
     try:
+        raw = AzureOpenAIModel.azure_openai_generate(
+            {"messages": messages, "timeout": config["INGESTION_LLM_TIMEOUT"]}
+        )
         js = json.loads(_extract_json(raw))
         sections = js.get("sections", [])
         ok = [s for s in sections if isinstance(s, dict) and "content" in s]
@@ -217,8 +232,8 @@ def llm_section_document(text: str) -> List[Dict[str, str]]:
                 {"heading": (s.get("heading") or "").strip(), "content": s["content"]}
                 for s in ok
             ]
-    except Exception:
-        pass
+    except Exception as e:
+        print(f"LLM sectioning failed ({e!r}); using heuristic sections")
     return heuristic_section_document(text)
 
 
@@ -231,8 +246,14 @@ def llm_summarize_text(text: str) -> str:
         },
         {"role": "user", "content": text},
     ]
-    resp = AzureOpenAIModel.azure_openai_generate({"messages": messages})
-    return resp.strip()
+    try:
+        resp = AzureOpenAIModel.azure_openai_generate(
+            {"messages": messages, "timeout": config["INGESTION_LLM_TIMEOUT"]}
+        )
+        return resp.strip()
+    except Exception as e:
+        print(f"LLM summary failed ({e!r}); using leading sentences")
+        return heuristic_summary(text)
 
 
 # --------------------------
@@ -240,129 +261,118 @@ def llm_summarize_text(text: str) -> str:
 # --------------------------
 
 
-def ingest_docs(config, docs):
+def prepare_doc(doc: Dict[str, str]) -> List[Dict]:
     """
     For each section emit:
       - heading row:   chunk_type='heading',  content = section heading text
       - summary row:   chunk_type='summary',  content = LLM summary of section
       - detailed rows: chunk_type='detailed', content = token-chunked section body
     Also emits a doc-level summary (chunk_type='summary', section_id="").
+    Ids are assigned by the pipeline from the row content.
     """
-    url = f"{config['AZURE_SEARCH_API_URL']}/indexes/{config['AZURE_SEARCH_API_INDEX']}/docs/index?api-version=2023-11-01"
-    headers = {
-        "api-key": config["AZURE_SEARCH_API_PRIMARY_ADMIN_KEY"],
-        "Content-Type": "application/json",
-    }
-    payload = []
-
-    for doc_num, doc in enumerate(docs, start=1):
-        print(f"Generating embedding for document '{doc_num}'")
-
-        doc_id = str(doc_num)
-        title = doc["title"]
-        full_text = doc["content"]
-
-        print(f"Sectioning doc {doc_id} with LLM")
-        sections = llm_section_document(full_text)
+    print(f"Preparing rows for document '{doc['source']}'")
+
+    doc_id = stable_id(doc["source"])
+    rows = []
+    title = doc["title"]
+    full_text = doc["content"]
+
+    # sectioning and the doc-level summary are independent: run them together
+    print(f"Sectioning and summarizing doc {doc_id} with LLM")
+    sections_call = _llm_pool.submit(llm_section_document, full_text)
+    doc_summary_call = (
+        _llm_pool.submit(llm_summarize_text, full_text)
+        if len(full_text) > 400
+        else None
+    )
+    sections = sections_call.result()
+
+    # per-section summaries fan out; results are read back in section order
+    section_summary_calls = [
+        (
+            _llm_pool.submit(llm_summarize_text, section["content"])
+            if section.get("content")
+            else None
+        )
+        for section in sections
+    ]
 
-        # Doc-level summary (coarse)
-        print("Summarizing text with LLM")
-        doc_summary_text = (
-            llm_summarize_text(full_text) if len(full_text) > 400 else full_text
+    # Doc-level summary (coarse)
+    doc_summary_text = doc_summary_call.result() if doc_summary_call else full_text
+    rows.append(
+        {
+            "@search.action": "mergeOrUpload",
+            "doc_id": doc_id,
+            "section_id": "",
+            "chunk_type": "summary",
+            "order": 0,
+            "title": title,
+            "section_heading": "Document",
+            "content": doc_summary_text,
+        }
+    )
+
+    section_chunks = chunk_sections(
+        [section.get("content", "") for section in sections]
+    )
+
+    # Sections → heading + summary + detailed
+    for s_idx, section in enumerate(sections, start=1):
+        section_id = f"{doc_id}-s{s_idx}"
+        section_heading = best_effort_heading(
+            section.get("heading") or "",
+            section.get("content", ""),
+            f"Section {s_idx}",
         )
-        payload.append(
+        section_body = section.get("content", "")
+
+        # heading row
+        heading_text = section_heading
+        rows.append(
             {
                 "@search.action": "mergeOrUpload",
-                "id": f"{doc_id}-docsum",
                 "doc_id": doc_id,
-                "section_id": "",
-                "chunk_type": "summary",
+                "section_id": section_id,
+                "chunk_type": "heading",
                 "order": 0,
                 "title": title,
-                "section_heading": "Document",
-                "content": doc_summary_text,
-                "embedding": AzureOpenAIModel.azure_openai_generate_embedding(
-                    doc_summary_text
-                ),
+                "section_heading": section_heading,
+                "content": heading_text,
             }
         )
 
-        # Sections → heading + summary + detailed
-        for s_idx, section in enumerate(sections, start=1):
-            section_id = f"{doc_id}-s{s_idx}"
-            section_heading = best_effort_heading(
-                section.get("heading") or "",
-                section.get("content", ""),
-                f"Section {s_idx}",
-            )
-            section_body = section.get("content", "")
-
-            # heading row
-            heading_text = section_heading
-            payload.append(
-                {
-                    "@search.action": "mergeOrUpload",
-                    "id": f"{section_id}-h",
-                    "doc_id": doc_id,
-                    "section_id": section_id,
-                    "chunk_type": "heading",
-                    "order": 0,
-                    "title": title,
-                    "section_heading": section_heading,
-                    "content": heading_text,
-                    "embedding": AzureOpenAIModel.azure_openai_generate_embedding(
-                        heading_text
-                    ),
-                }
-            )
+        # summary row (per-section)
+        summary_call = section_summary_calls[s_idx - 1]
+        section_summary = summary_call.result() if summary_call else ""
+        rows.append(
+            {
+                "@search.action": "mergeOrUpload",
+                "doc_id": doc_id,
+                "section_id": section_id,
+                "chunk_type": "summary",
+                "order": 1,
+                "title": title,
+                "section_heading": section_heading,
+                "content": section_summary,
+            }
+        )
 
-            # summary row (per-section)
-            section_summary = llm_summarize_text(section_body) if section_body else ""
-            payload.append(
+        # detailed rows
+        for c_idx, chunk in enumerate(section_chunks[s_idx - 1], start=1):
+            rows.append(
                 {
                     "@search.action": "mergeOrUpload",
-                    "id": f"{section_id}-sum",
                     "doc_id": doc_id,
                     "section_id": section_id,
-                    "chunk_type": "summary",
-                    "order": 1,
+                    "chunk_type": "detailed",
+                    "order": 2 + c_idx,
                     "title": title,
                     "section_heading": section_heading,
-                    "content": section_summary,
-                    "embedding": AzureOpenAIModel.azure_openai_generate_embedding(
-                        section_summary or section_heading
-                    ),
+                    "content": chunk,
                 }
             )
 
-            # detailed rows
-            chunks = (
-                chunk_by_tokens(section_body, max_tokens=600, overlap=60)
-                if section_body
-                else []
-            )
-            for c_idx, chunk in enumerate(chunks, start=1):
-                payload.append(
-                    {
-                        "@search.action": "mergeOrUpload",
-                        "id": f"{section_id}-d{c_idx}",
-                        "doc_id": doc_id,
-                        "section_id": section_id,
-                        "chunk_type": "detailed",
-                        "order": 2 + c_idx,
-                        "title": title,
-                        "section_heading": section_heading,
-                        "content": chunk,
-                        "embedding": AzureOpenAIModel.azure_openai_generate_embedding(
-                            chunk
-                        ),
-                    }
-                )
-
-    r = requests.post(url, headers=headers, data=json.dumps({"value": payload}))
-    if r.status_code >= 400:
-        raise RuntimeError(f"Ingestion failed: {r.status_code}, {r.text}")
-    print(f"Ingested {len(payload)} records (heading + summary + detailed).")
+    return rows
 
 
 # --------------------------
@@ -371,13 +381,44 @@ def ingest_docs(config, docs):
 
 
 def main(config):
-    delete_index_if_exists(config)
-    create_hybrid_index(config)
-
-    docs = load_docs_from_folder("src/docs")
-    if not docs:
+    manifest = get_ingestion_manifest(config["AZURE_SEARCH_API_INDEX"])
+
+    # BYPASS=azure_search_api ingests into the local in-process index instead
+    local = get_local_search_index() if "azure_search_api" in config["BYPASS"] else None
+    exists = local.exists() if local is not None else index_exists(config)
+
+    if config["INGESTION_FULL_REBUILD"] or manifest.pipeline != PIPELINE or not exists:
+        if local is not None:
+            local.clear()
+        else:
+            delete_index_if_exists(config)
+            create_hybrid_index(config)
+        manifest.reset(PIPELINE)
+        manifest.save()
+
+    docs = iter_docs_from_folder("src/docs", recursive=True)
+    first = next(docs, None)
+    if first is None:
         raise RuntimeError(
             "No documents found in ./docs — please add at least one .txt file."
         )
 
-    ingest_docs(config, docs)
+    pipeline = IngestionPipeline(
+        prepare_doc,
+        AzureOpenAIModel.azure_openai_generate_embeddings,
+        local.upload if local is not None else AzureSearchUploader(config).upload,
+        manifest=manifest,
+        # empty section summaries are embedded by their heading
+        embed_text=lambda row: row["content"] or row["section_heading"],
+    )
+    stats = pipeline.run(itertools.chain([first], docs))
+    if stats["rows_uploaded"] or stats["stale_deleted"]:
+        # invalidates cached search results computed against the old contents
+        bump_index_version()
+    print(f"Ingestion (heading + summary + detailed): {stats}")
+
+    print(f"HTTP transport: {get_http_transport().stats.snapshot()}")
+
+    cache = get_embedding_cache()
+    if cache is not None:
+        print(f"Embedding cache: {cache.stats()}")
@@ -1,5 +1,6 @@
 from models.watson import WatsonXModel
-from models.azure import AzureOpenAIModel
+from models.rag import RagPipeline
+from utils.http import get_http_transport
 
 
 def main(**_):
@@ -15,33 +16,25 @@ def main(**_):
     for query, expected_substring in test_cases.items():
         print(f"\nTesting query: {repr(query)} ...")
 
-        # Step 1: Guardrails
-        guardrails_result = WatsonXModel.guardrails_check(
-            [
-                {
-                    "role": "user",
-                    "content": [{"type": "text", "text": query}],
-                }
-            ]
-        )
-
-        print(f"Guardrails result: {repr(guardrails_result)}")
-
-        if "unsafe" in guardrails_result.lower():
-            print(f"FAIL: Guardrails blocked an unsafe query: {repr(query)}")
+        # Step 1 + 2: Guardrails and search run concurrently
+        try:
+            result = RagPipeline.guarded_search({"query": query})
+        except Exception as e:
+            print(f"Error: {e}")
             all_passed = False
 
             continue
 
-        # Step 2: Search
-        try:
-            docs = AzureOpenAIModel.azure_search({"query": query})
-        except Exception as e:
-            print(f"Error: {e}")
+        print(f"Guardrails result: {repr(result['guardrails'])}")
+
+        if result["is_unsafe"]:
+            print(f"FAIL: Guardrails blocked an unsafe query: {repr(query)}")
             all_passed = False
 
             continue
 
+        docs = result["docs"]
+
         if not docs:
             print(f"FAIL: No results for {repr(query)}")
             all_passed = False
@@ -60,6 +53,9 @@ def main(**_):
             print(f"Got: {combined_content}")
             all_passed = False
 
+    print(f"\nHTTP transport: {get_http_transport().stats.snapshot()}")
+    print(f"Guardrails verdict cache: {WatsonXModel.verdict_cache.stats()}")
+
     if all_passed:
         print("\nAll basic RAG tests passed!")
     else:
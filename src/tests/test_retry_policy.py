@@ -0,0 +1,61 @@
+import httpx
+import openai
+
+from utils.retry import RetryPolicy
+
+_REQUEST = httpx.Request("POST", "https://example.invalid/chat/completions")
+
+
+def status_error(status, headers=None):
+    response = httpx.Response(status, headers=headers, request=_REQUEST)
+    if status == 429:
+        return openai.RateLimitError("throttled", response=response, body=None)
+    return openai.InternalServerError("server error", response=response, body=None)
+
+
+def attempts(error, idempotent):
+    """Number of calls a policy makes when every attempt raises `error`."""
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise error
+
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.001)
+    try:
+        policy.call(fail, idempotent=idempotent)
+    except Exception:
+        pass
+    return len(calls)
+
+
+def main(**_):
+    timeout = openai.APITimeoutError(request=_REQUEST)
+
+    # (case, error, idempotent, expected attempts)
+    test_cases = [
+        ("generation timeout is not resent", timeout, False, 1),
+        ("generation 500 is not resent", status_error(500), False, 1),
+        (
+            "generation 429 is resent",
+            status_error(429, {"retry-after-ms": "1"}),
+            False,
+            3,
+        ),
+        ("idempotent timeout is resent", timeout, True, 3),
+        ("idempotent 500 is resent", status_error(500), True, 3),
+    ]
+
+    all_passed = True
+    for case, error, idempotent, expected in test_cases:
+        got = attempts(error, idempotent)
+        if got == expected:
+            print(f"PASS: {case} ({got} attempt(s))")
+        else:
+            print(f"FAIL: {case}: expected {expected} attempt(s), got {got}")
+            all_passed = False
+
+    if all_passed:
+        print("\nAll retry policy tests passed!")
+    else:
+        print("\nSome tests failed. Check output above.")
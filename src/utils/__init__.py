@@ -1,4 +1,74 @@
-from .parsers import dump_json
-from .load import load_docs_from_folder
+from .parsers import dump_json, dump_json_compact, format_tool_docs, project_docs
+from .cache import TTLCache, normalize_text
+from .chunking import TokenChunker
+from .context import ContextPacker, pack_context
+from .embedding_cache import EmbeddingCache, get_embedding_cache
+from .ingestion import IngestionPipeline
+from .load import iter_docs_from_folder, load_docs_from_folder
+from .loop_runner import LoopRunner, get_loop_runner
+from .local_search import LocalSearchIndex, SearchBackend, get_local_search_index
+from .manifest import (
+    IngestionManifest,
+    content_hash,
+    get_ingestion_manifest,
+    stable_id,
+)
+from .fusion import reciprocal_rank_fusion
+from .index_version import IndexVersion, bump_index_version, get_index_version
+from .http import (
+    AsyncHttpTransport,
+    HttpTransport,
+    get_async_http_transport,
+    get_http_transport,
+)
+from .ratelimit import RateLimiter
+from .registry import ClientRegistry, client_registry
+from .retry import HttpStatusError, RetryPolicy
+from .semantic_chunking import SemanticChunker, get_semantic_chunker
+from .streaming import TextStream
+from .tokens import count_tokens, get_encoding, plan_token_batches
 
-__all__ = ["dump_json", "load_docs_from_folder"]
+__all__ = [
+    "AsyncHttpTransport",
+    "bump_index_version",
+    "client_registry",
+    "ClientRegistry",
+    "content_hash",
+    "ContextPacker",
+    "count_tokens",
+    "dump_json",
+    "dump_json_compact",
+    "EmbeddingCache",
+    "get_embedding_cache",
+    "format_tool_docs",
+    "get_async_http_transport",
+    "get_encoding",
+    "get_semantic_chunker",
+    "get_http_transport",
+    "get_index_version",
+    "get_ingestion_manifest",
+    "get_local_search_index",
+    "get_loop_runner",
+    "HttpStatusError",
+    "HttpTransport",
+    "IndexVersion",
+    "IngestionManifest",
+    "IngestionPipeline",
+    "iter_docs_from_folder",
+    "load_docs_from_folder",
+    "LocalSearchIndex",
+    "LoopRunner",
+    "normalize_text",
+    "pack_context",
+    "plan_token_batches",
+    "project_docs",
+    "RateLimiter",
+    "reciprocal_rank_fusion",
+    "RetryPolicy",
+    "SearchBackend",
+    "SemanticChunker",
+    "stable_id",
+    "TextStream",
+    "TokenChunker",
+    "TTLCache",
+]
@@ -0,0 +1,132 @@
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .tokens import get_encoding
+
+# end of a sentence (terminator + closing quotes/brackets + whitespace) or a paragraph break
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+|\n\s*\n")
+
+
+class TokenChunker:
+    """Overlapping token-window chunker that slices the source text by offset.
+
+    Each text is encoded once (many texts at a time via tiktoken's threaded
+    encode_batch). Token windows are mapped back to character offsets through
+    their byte lengths, so chunks are exact substrings of the input. No window is
+    decoded to text, and windows never split a multi-byte character. With
+    `snap_to_sentences`, window edges move to sentence boundaries within the
+    overlap, which needs overlap > 0.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 500,
+        overlap: int = 50,
+        *,
+        encoding_name: str = "cl100k_base",
+        snap_to_sentences: bool = False,
+        num_threads: int = 8,
+    ) -> None:
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+
+        self.max_tokens = max_tokens
+        self.overlap = overlap if 0 <= overlap < max_tokens else 0
+        self.snap_to_sentences = snap_to_sentences
+        self.num_threads = num_threads
+        self.encoding = get_encoding(encoding_name)
+
+    def encode_many(self, texts: Sequence[str]) -> List[List[int]]:
+        return self.encoding.encode_batch(
+            list(texts), num_threads=self.num_threads, disallowed_special=()
+        )
+
+    def spans(
+        self, text: str, tokens: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, int]]:
+        """Character (start, end) offsets of each chunk of `text`."""
+        return [(s, e) for s, e, _ in self.token_spans(text, tokens)]
+
+    def token_spans(
+        self, text: str, tokens: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, int, int]]:
+        """`spans` with the token count of each chunk's window (an upper bound
+        when sentence snapping shrank the chunk)."""
+        if tokens is None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+        if not tokens:
+            return []
+
+        step = self.max_tokens - self.overlap
+        windows = []
+        for start in range(0, len(tokens), step):
+            end = min(start + self.max_tokens, len(tokens))
+            windows.append((start, min(start + self.overlap, end), end))
+            if end == len(tokens):
+                break
+
+        # byte offset of every window edge; each token's bytes are produced once,
+        # in disjoint segments between consecutive edges
+        byte_offsets: Dict[int, int] = {}
+        prev = offset = 0
+        for i in sorted({i for window in windows for i in window}):
+            offset += len(self.encoding.decode_bytes(tokens[prev:i]))
+            byte_offsets[i] = offset
+            prev = i
+
+        to_char = self._char_offsets(text, list(byte_offsets.values()))
+        raw = [tuple(to_char[byte_offsets[i]] for i in window) for window in windows]
+        spans: List[Tuple[int, int, int]] = []
+        for i, (s, o, e) in enumerate(raw):
+            # snap only inside the overlap with the neighbouring windows, so every
+            # character stays covered and no window grows past max_tokens
+            if self.snap_to_sentences and spans:
+                # with overlap > step, the previous start may have snapped past
+                # this one; never start before it
+                s = max(s, spans[-1][0])
+                m = _SENTENCE_END.search(text, s, min(o, spans[-1][1]))
+                if m:
+                    s = m.end()
+
+            if self.snap_to_sentences and i + 1 < len(raw):
+                ends = [m.end() for m in _SENTENCE_END.finditer(text, raw[i + 1][0], e)]
+                if ends and ends[-1] > s:
+                    e = ends[-1]
+
+            # empty (a window inside one multi-byte character) or within the
+            # previous span: it would only repeat text already chunked
+            if s < e and not (spans and e <= spans[-1][1]):
+                spans.append((s, e, windows[i][2] - windows[i][0]))
+
+        return spans
+
+    def chunk(self, text: str) -> List[str]:
+        return [text[s:e] for s, e in self.spans(text)]
+
+    def chunk_many(self, texts: Sequence[str]) -> List[List[str]]:
+        """Chunk many texts, encoding them in one multithreaded batch."""
+        return [
+            [text[s:e] for s, e in self.spans(text, tokens)]
+            for text, tokens in zip(texts, self.encode_many(texts))
+        ]
+
+    @staticmethod
+    def _char_offsets(text: str, byte_offsets: List[int]) -> Dict[int, int]:
+        """Map byte offsets to character offsets, moving any offset inside a
+        multi-byte character to the start of the next character."""
+        if text.isascii():
+            return {b: b for b in byte_offsets}
+
+        raw = text.encode("utf-8")
+        out: Dict[int, int] = {}
+        chars = prev = 0
+
+        for b in sorted(set(byte_offsets)):
+            aligned = b
+            while aligned < len(raw) and (raw[aligned] & 0xC0) == 0x80:
+                aligned += 1  # continuation byte
+            chars += len(raw[prev:aligned].decode("utf-8"))
+            prev = aligned
+            out[b] = chars
+
+        return out
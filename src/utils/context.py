@@ -0,0 +1,105 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from globals import config
+from .chunking import _SENTENCE_END
+from .tokens import get_encoding
+
+Doc = Dict[str, Any]
+
+
+class ContextPacker:
+    """Fits retrieved documents into a prompt token budget.
+
+    Documents are taken in `@search.score` order. Text that repeats what is
+    already packed is dropped: duplicates, chunks contained in another, and the
+    overlap that adjacent chunks of the same title share. The first document
+    that does not fit is truncated at a sentence boundary (when at least
+    `min_tokens` remain) and packing stops there.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        *,
+        field: str = "content",
+        doc_overhead: int = 4,
+        min_tokens: int = 32,
+        min_overlap: int = 32,
+        encoding_name: str = "cl100k_base",
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.field = field
+        self.doc_overhead = doc_overhead
+        self.min_tokens = min_tokens
+        self.min_overlap = min_overlap
+        self.encoding = get_encoding(encoding_name)
+
+    def pack(self, docs: Sequence[Doc]) -> List[Doc]:
+        ranked = sorted(docs, key=lambda d: d.get("@search.score") or 0.0, reverse=True)
+        packed: List[Doc] = []
+        budget = self.max_tokens
+
+        for doc in ranked:
+            text = self._dedupe(doc, packed)
+            if not text:
+                continue
+
+            tokens = self.encoding.encode(text, disallowed_special=())
+            room = budget - self.doc_overhead
+            if len(tokens) <= room:
+                packed.append({**doc, self.field: text})
+                budget = room - len(tokens)
+                continue
+
+            if room >= self.min_tokens:
+                text = self._truncate(tokens[:room])
+                if text:
+                    packed.append({**doc, self.field: text})
+            break
+
+        return packed
+
+    def _dedupe(self, doc: Doc, packed: List[Doc]) -> str:
+        text = (doc.get(self.field) or "").strip()
+
+        for other in packed:
+            seen = other[self.field]
+            if text in seen:
+                return ""
+            if other.get("title") != doc.get("title"):
+                continue
+            # adjacent chunks: drop the part this one shares with the other's end or start
+            text = text[_overlap(seen, text, self.min_overlap) :]
+            cut = _overlap(text, seen, self.min_overlap)
+            if cut:
+                text = text[: len(text) - cut]
+            text = text.strip()
+
+        return text
+
+    def _truncate(self, tokens: Sequence[int]) -> str:
+        text = self.encoding.decode(list(tokens), errors="ignore")
+        ends = [m.end() for m in _SENTENCE_END.finditer(text)]
+        if ends:
+            return text[: ends[-1]].strip()
+        # no sentence end in range: cut at the last word boundary
+        return text.rsplit(None, 1)[0] if " " in text else text
+
+
+def _overlap(left: str, right: str, min_len: int) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    if len(right) < min_len:
+        return 0
+
+    anchor = right[:min_len]
+    start = left.find(anchor, max(0, len(left) - len(right)))
+    while start != -1:
+        if right.startswith(left[start:]):
+            return len(left) - start
+        start = left.find(anchor, start + 1)
+    return 0
+
+
+def pack_context(docs: Sequence[Doc], max_tokens: Optional[int] = None) -> List[Doc]:
+    """Pack documents into `max_tokens` (default CONTEXT_MAX_TOKENS)."""
+    return ContextPacker(max_tokens or config["CONTEXT_MAX_TOKENS"]).pack(docs)
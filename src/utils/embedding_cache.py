@@ -0,0 +1,159 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+from globals import config
+from .registry import client_registry
+
+_SQLITE_MAX_PARAMS = 500
+
+
+class EmbeddingCache:
+    """Persistent, content-addressed embedding store (SQLite, float32 blobs) with LRU eviction.
+
+    Reads do not write: hits are recorded in memory and their `last_used` is
+    written in batches of `touch_batch`, before an eviction, and on close.
+    """
+
+    def __init__(
+        self, path: str, max_entries: int = 100_000, touch_batch: int = 1024
+    ) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        # key -> last read time, not yet written
+        self._touched: Dict[str, float] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " dims INTEGER NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, dimensions: Optional[int], text: str) -> str:
+        h = hashlib.sha256(f"{model}\0{dimensions or ''}\0".encode("utf-8"))
+        h.update(text.encode("utf-8"))
+        return h.hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            for start in range(0, len(keys), _SQLITE_MAX_PARAMS):
+                part = keys[start : start + _SQLITE_MAX_PARAMS]
+                rows = self._conn.execute(
+                    "SELECT key, vector FROM embeddings WHERE key IN "
+                    f"({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+
+            now = time.time()
+            for key in found:
+                self._touched[key] = now
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touches()
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+
+        now = time.time()
+        rows = [
+            (key, len(vector), array("f", vector).tobytes(), now)
+            for key, vector in items.items()
+        ]
+
+        with self._lock:
+            # eviction orders by last_used, so pending reads are written first
+            self._flush_touches()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dims, vector, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _flush_touches(self) -> None:
+        if not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE embeddings SET last_used = ? WHERE key = ?",
+            [(now, key) for key, now in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": count,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+            self._conn.close()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide embedding cache, or None when EMBEDDING_CACHE_PATH is empty."""
+    if not config["EMBEDDING_CACHE_PATH"]:
+        return None
+
+    return client_registry.get_or_create(
+        ("embedding_cache", config["EMBEDDING_CACHE_PATH"]),
+        lambda: EmbeddingCache(
+            config["EMBEDDING_CACHE_PATH"],
+            max_entries=config["EMBEDDING_CACHE_MAX_ENTRIES"],
+        ),
+    )
@@ -0,0 +1,44 @@
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+Doc = Dict[str, Any]
+
+
+def doc_key(doc: Doc) -> Hashable:
+    """Identity of a search result: its key, else its title and content."""
+    if doc.get("id") is not None:
+        return doc["id"]
+    return (doc.get("title"), doc.get("content"))
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Doc]],
+    weights: Optional[Sequence[float]] = None,
+    *,
+    k: int = 60,
+    top: Optional[int] = None,
+    key: Callable[[Doc], Hashable] = doc_key,
+) -> List[Doc]:
+    """Fuse ranked result lists: score(d) = sum(weight / (k + rank)).
+
+    Only ranks are used, so lists from different queries or backends (BM25,
+    cosine, Azure's own scores) combine without normalizing their scores. Each
+    fused document keeps the fields of its first occurrence, with `@search.score`
+    replaced by the fused score.
+    """
+    if weights is None:
+        weights = [1.0] * len(rankings)
+    if len(weights) != len(rankings):
+        raise ValueError("weights must match the number of rankings")
+
+    scores: Dict[Hashable, float] = {}
+    docs: Dict[Hashable, Doc] = {}
+
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc in enumerate(ranking, 1):
+            doc_id = key(doc)
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+            docs.setdefault(doc_id, doc)
+
+    # sorted() is stable, so ties keep first-seen order
+    fused = sorted(scores, key=scores.__getitem__, reverse=True)[:top]
+    return [{**docs[doc_id], "@search.score": scores[doc_id]} for doc_id in fused]
@@ -0,0 +1,204 @@
+import socket
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from globals import config
+from .registry import client_registry
+
+
+class _TransportStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_connection(self) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(self.requests - self.connections_opened, 0)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": reused,
+                "reuse_ratio": (
+                    round(reused / self.requests, 3) if self.requests else 0.0
+                ),
+            }
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter that counts new sockets so connection reuse is observable."""
+
+    def __init__(
+        self, stats: _TransportStats, *, tcp_keepalive: bool, **kwargs
+    ) -> None:
+        # init_poolmanager runs inside HTTPAdapter.__init__, so set these first
+        self._stats = stats
+        self._tcp_keepalive = tcp_keepalive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        if self._tcp_keepalive:
+            pool_kwargs.setdefault(
+                "socket_options",
+                HTTPConnection.default_socket_options
+                + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)],
+            )
+
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+
+        stats = self._stats
+
+        class _CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                stats.record_connection()
+                return super()._new_conn()
+
+        class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                stats.record_connection()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        self._stats.record_request()
+        return super().send(request, **kwargs)
+
+
+class HttpTransport:
+    """Keep-alive, connection-pooled HTTP session shared by search and index calls."""
+
+    def __init__(
+        self,
+        *,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        tcp_keepalive: bool = True,
+        timeout: Optional[float] = 30.0,
+    ) -> None:
+        self.stats = _TransportStats()
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        adapter = _PooledAdapter(
+            self.stats,
+            tcp_keepalive=tcp_keepalive,
+            pool_connections=pool_connections,  # number of hosts kept pooled
+            pool_maxsize=pool_maxsize,  # connections kept per host
+            pool_block=pool_block,  # wait for a free connection instead of opening extras
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncHttpTransport:
+    """Async counterpart of HttpTransport built on a pooled httpx.AsyncClient."""
+
+    def __init__(
+        self,
+        *,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: Optional[float] = 30.0,
+    ) -> None:
+        self.stats = _TransportStats()
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=timeout,
+        )
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.stats.record_connection()
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        self.stats.record_request()
+        kwargs.setdefault("extensions", {})["trace"] = self._trace
+        return await self.client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def get_http_transport() -> HttpTransport:
+    """Return the process-wide transport, creating it from config on first use."""
+    return client_registry.get_or_create(
+        ("http",),
+        lambda: HttpTransport(
+            pool_connections=config["HTTP_POOL_CONNECTIONS"],
+            pool_maxsize=config["HTTP_POOL_MAXSIZE"],
+            pool_block=config["HTTP_POOL_BLOCK"],
+            tcp_keepalive=config["HTTP_TCP_KEEPALIVE"],
+            timeout=config["HTTP_TIMEOUT"],
+        ),
+    )
+
+
+def get_async_http_transport() -> AsyncHttpTransport:
+    """Async transport for the running event loop, created from config on first use."""
+    return client_registry.get_or_create_for_loop(
+        ("async_http",),
+        lambda: AsyncHttpTransport(
+            max_connections=(
+                config["HTTP_POOL_CONNECTIONS"] * config["HTTP_POOL_MAXSIZE"]
+                if config["HTTP_POOL_BLOCK"]
+                else None
+            ),
+            max_keepalive_connections=config["HTTP_POOL_MAXSIZE"],
+            timeout=config["HTTP_TIMEOUT"],
+        ),
+    )
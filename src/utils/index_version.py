@@ -0,0 +1,63 @@
+import os
+import threading
+import time
+from typing import Optional
+
+from globals import config
+from .registry import client_registry
+
+
+class IndexVersion:
+    """Version tag of a search index, kept in a file so every process sees a bump.
+
+    Ingestion bumps it when it finishes; caches key results by it, so a bump
+    invalidates exactly the results computed against the old contents. `get`
+    re-reads the file only when its mtime changes.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[int] = None
+        self._version = "0"
+
+    def get(self) -> str:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return "0"
+
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._version = f.read().strip() or "0"
+                self._mtime = mtime
+            return self._version
+
+    def bump(self) -> str:
+        version = str(time.time_ns())
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp, self.path)
+        return version
+
+
+def get_index_version(index: Optional[str] = None) -> IndexVersion:
+    """Version of `index` (default: the configured search index)."""
+    path = os.path.join(
+        config["INDEX_VERSION_DIR"],
+        f"{index or config['AZURE_SEARCH_API_INDEX']}.version",
+    )
+    return client_registry.get_or_create(
+        ("index_version", path), lambda: IndexVersion(path)
+    )
+
+
+def bump_index_version(index: Optional[str] = None) -> str:
+    """Mark `index` (default: the configured one) as changed; call after any write
+    to its contents or schema."""
+    return get_index_version(index).bump()
@@ -0,0 +1,210 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from globals import config
+from .manifest import IngestionManifest, content_hash
+
+Row = Dict[str, Any]
+
+_DONE = object()
+
+
+class _StageError:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+def _buffered(items: Iterable[Any], maxsize: int, name: str) -> Iterator[Any]:
+    """Run `items` in a background thread, handing results over a bounded queue.
+
+    The producer blocks once `maxsize` items are waiting, so a fast stage cannot
+    run ahead of a slow one and memory stays bounded. Producer errors are re-raised
+    in the consumer.
+    """
+    q: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_StageError(e))
+            return
+        put(_DONE)
+
+    thread = threading.Thread(target=produce, name=f"ingest-{name}", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+
+class IngestionPipeline:
+    """Streaming load -> prepare -> embed -> upload.
+
+    Each stage runs in its own thread, connected by bounded queues, so the stages
+    overlap and only a few documents/batches are in flight at any time.
+
+    - `prepare(doc)` turns a document into index rows (sectioning, chunking, ...);
+      up to `prepare_workers` documents are prepared at once, in input order.
+    - `embed(texts)` returns one vector per text.
+    - `upload(actions)` sends index actions and returns a dict with `succeeded`
+      and `failed`. It is called once with a stream of every embedded row, so
+      it can batch and send them concurrently as they arrive, and once more
+      with stale-row deletes.
+    - With a `manifest`, unchanged documents and already-indexed rows are skipped,
+      and ids no longer produced by any document are deleted.
+    """
+
+    def __init__(
+        self,
+        prepare: Callable[[Dict[str, str]], List[Row]],
+        embed: Callable[[List[str]], List[List[float]]],
+        upload: Callable[[List[Row]], Dict[str, Any]],
+        *,
+        manifest: Optional[IngestionManifest] = None,
+        embed_text: Callable[[Row], str] = lambda row: row["content"],
+        batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        prepare_workers: Optional[int] = None,
+    ) -> None:
+        self.prepare = prepare
+        self.embed = embed
+        self.upload = upload
+        self.manifest = manifest
+        self.embed_text = embed_text
+        self.batch_size = batch_size or config["INGESTION_BATCH_SIZE"]
+        self.queue_size = queue_size or config["INGESTION_QUEUE_SIZE"]
+        self.prepare_workers = prepare_workers or config["INGESTION_PREPARE_WORKERS"]
+
+    def run(self, docs: Iterable[Dict[str, str]]) -> Dict[str, Any]:
+        t0 = time.time()
+        stats = {
+            "documents": 0,
+            "documents_changed": 0,
+            "documents_removed": 0,
+            "rows": 0,
+            "rows_uploaded": 0,
+            "stale_deleted": 0,
+        }
+        sources: List[str] = []
+        prepared: Dict[str, tuple[str, List[str]]] = {}
+
+        def changed_docs() -> Iterator[Dict[str, str]]:
+            for doc in docs:
+                stats["documents"] += 1
+                sources.append(doc["source"])
+                if self.manifest is None or self.manifest.changed([doc]):
+                    stats["documents_changed"] += 1
+                    yield doc
+
+        def prepared_docs() -> Iterator[tuple[Dict[str, str], List[Row]]]:
+            loaded = _buffered(changed_docs(), self.queue_size, "load")
+            if self.prepare_workers <= 1:
+                for doc in loaded:
+                    yield doc, self.prepare(doc)
+                return
+
+            with ThreadPoolExecutor(
+                self.prepare_workers, thread_name_prefix="ingest-prepare"
+            ) as executor:
+                # bounded window of in-flight documents, results taken in input order
+                pending = deque()
+                for doc in loaded:
+                    pending.append((doc, executor.submit(self.prepare, doc)))
+                    if len(pending) >= self.prepare_workers:
+                        doc, future = pending.popleft()
+                        yield doc, future.result()
+
+                while pending:
+                    doc, future = pending.popleft()
+                    yield doc, future.result()
+
+        def fresh_rows() -> Iterator[tuple[Row, str]]:
+            for doc, rows in prepared_docs():
+                stats["rows"] += len(rows)
+
+                fresh = [True] * len(rows)
+                if self.manifest is not None:
+                    fresh = self.manifest.assign_ids(doc["source"], rows)
+                    prepared[doc["source"]] = (
+                        content_hash(doc["content"]),
+                        [row["id"] for row in rows],
+                    )
+
+                for row, is_new in zip(rows, fresh):
+                    if is_new:
+                        yield row, self.embed_text(row)
+
+        def embedded_batches() -> Iterator[List[Row]]:
+            batch: List[tuple[Row, str]] = []
+            for item in _buffered(fresh_rows(), self.queue_size * 64, "prepare"):
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    yield self._embed_batch(batch)
+                    batch = []
+            if batch:
+                yield self._embed_batch(batch)
+
+        def embedded_rows() -> Iterator[Row]:
+            embedded = 0
+            for batch in _buffered(embedded_batches(), self.queue_size, "embed"):
+                embedded += len(batch)
+                print(f"Embedded {embedded} row(s)")
+                yield from batch
+
+        stats["rows_uploaded"] = self._upload(embedded_rows())
+
+        if self.manifest is not None:
+            stale: List[str] = []
+            for source, (digest, ids) in prepared.items():
+                stale += self.manifest.update(source, digest, ids)
+
+            removed = self.manifest.removed(sources)
+            stats["documents_removed"] = len(removed)
+            for source in removed:
+                stale += self.manifest.remove(source)
+
+            if stale:
+                self._upload([{"@search.action": "delete", "id": i} for i in stale])
+                stats["stale_deleted"] = len(stale)
+
+            self.manifest.save()
+
+        stats["elapsed_ms"] = round((time.time() - t0) * 1000, 1)
+        return stats
+
+    def _embed_batch(self, batch: List[tuple[Row, str]]) -> List[Row]:
+        embeddings = self.embed([text for _, text in batch])
+        for (row, _), embedding in zip(batch, embeddings):
+            row["embedding"] = embedding
+        return [row for row, _ in batch]
+
+    def _upload(self, actions: Iterable[Row]) -> int:
+        result = self.upload(actions)
+        if result["failed"]:
+            raise RuntimeError(f"Ingestion failed: {result['failed']}")
+        return result["succeeded"]
@@ -1,14 +1,30 @@
 import pathlib
 
-from typing import Dict
+from typing import Dict, Iterator
 
 
-def load_docs_from_folder(folder_path) -> list[Dict[str, str]]:
-    """Load all .txt files from docs/ folder."""
-    docs = []
-    for f in pathlib.Path(folder_path).glob("*.txt"):
+def iter_docs_from_folder(
+    folder_path, pattern: str = "*.txt", recursive: bool = False
+) -> Iterator[Dict[str, str]]:
+    """Yield documents one file at a time; nothing beyond the current file is held in memory."""
+    root = pathlib.Path(folder_path)
+    files = root.rglob(pattern) if recursive else root.glob(pattern)
+
+    for f in sorted(files):
+        if not f.is_file():
+            continue
+
         with open(f, "r", encoding="utf-8") as fh:
-            docs.append({"title": f.stem, "content": fh.read()})
+            yield {
+                "title": f.stem,
+                "content": fh.read(),
+                "source": f.relative_to(root).as_posix(),
+            }
+
+
+def load_docs_from_folder(folder_path, recursive: bool = False) -> list[Dict[str, str]]:
+    """Load all .txt files from docs/ folder."""
+    docs = list(iter_docs_from_folder(folder_path, recursive=recursive))
     print(f"Loaded {len(docs)} document(s) from '{folder_path}'.")
 
     return docs
@@ -0,0 +1,413 @@
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+)
+
+import numpy as np
+
+from globals import config
+from .fusion import reciprocal_rank_fusion
+from .odata import compile_filter, order_by
+from .registry import client_registry
+
+Doc = Dict[str, Any]
+
+_WORD = re.compile(r"\w+")
+
+# per-signal candidates fused in hybrid mode (Azure also ranks 50 for text)
+_HYBRID_CANDIDATES = 50
+
+# actions applied per append or rewrite within one upload call
+_UPLOAD_CHUNK = 1024
+
+
+class SearchBackend(Protocol):
+    """Retrieval backend behind `AzureOpenAIModel.azure_search`.
+
+    `params` are the `AzureSearchParams` (query, top, use_vectors, hybrid, select,
+    filter, orderby);
+    `embedding` is the query vector when `use_vectors` is set. Results are
+    documents with their selected fields and `@search.score`.
+    """
+
+    def search(
+        self, params: Dict[str, Any], embedding: Optional[List[float]] = None
+    ) -> List[Doc]: ...
+
+    async def asearch(
+        self, params: Dict[str, Any], embedding: Optional[List[float]] = None
+    ) -> List[Doc]: ...
+
+
+def _chunks(items: Iterable[Doc], size: int) -> Iterator[List[Doc]]:
+    it = iter(items)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), np.finfo(np.float32).tiny)
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def select_fields(doc: Doc, select: Optional[str]) -> Doc:
+    if not select:
+        return {k: v for k, v in doc.items() if k != "embedding"}
+    return {f: doc.get(f) for f in (s.strip() for s in select.split(",")) if f}
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of term -> [(doc, term frequency)]."""
+
+    def __init__(self, texts: Sequence[str], k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[tuple[int, int]]] = defaultdict(list)
+        self.lengths = np.zeros(len(texts), dtype=np.float32)
+
+        for i, text in enumerate(texts):
+            terms = tokenize(text)
+            self.lengths[i] = len(terms)
+            for term, tf in Counter(terms).items():
+                self.postings[term].append((i, tf))
+
+        n = len(texts)
+        self.avg_length = float(self.lengths.mean()) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self.postings.items()
+        }
+
+    def top(
+        self, query: str, k: int, allowed: Optional[np.ndarray] = None
+    ) -> List[tuple[int, float]]:
+        scores: Dict[int, float] = defaultdict(float)
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / (self.avg_length or 1))
+
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self.postings[term]:
+                if allowed is not None and not allowed[i]:
+                    continue
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm[i])
+
+        return [
+            (i, float(score))
+            for i, score in heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        ]
+
+
+class LocalSearchIndex:
+    """In-process index for small deployments and tests; implements `SearchBackend`.
+
+    Stored in `path` as `docs.jsonl` (fields without embeddings, one document
+    per line), `embeddings.f32`, a row-per-document float32 matrix of unit
+    vectors, and `meta.json` (row count and dimensions, written last, so a
+    half-finished write is ignored). The matrix is memory-mapped, so vector
+    search is an exact cosine top-k as one matrix product. Keyword search is
+    BM25 over the `searchable` text fields.
+
+    `upload(actions)` accepts the same `@search.action` rows as
+    `AzureSearchUploader.upload` and returns the same result shape, so it
+    plugs into `IngestionPipeline` unchanged. New documents are appended to
+    the store; only updates and deletes of existing ones rewrite it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        key_field: str = "id",
+        searchable: Sequence[str] = ("title", "section_heading", "content"),
+    ) -> None:
+        self.path = path
+        self.key_field = key_field
+        self.searchable = tuple(searchable)
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def _docs_path(self) -> str:
+        return os.path.join(self.path, "docs.jsonl")
+
+    @property
+    def _matrix_path(self) -> str:
+        return os.path.join(self.path, "embeddings.f32")
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    def exists(self) -> bool:
+        return os.path.exists(self._meta_path)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _load(self) -> None:
+        docs: List[Doc] = []
+        dims = 0
+        if self.exists():
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            dims = meta["dims"]
+            with open(self._docs_path, "r", encoding="utf-8") as f:
+                docs = [json.loads(line) for line in itertools.islice(f, meta["count"])]
+
+        matrix = np.zeros((len(docs), dims), dtype=np.float32)
+        if docs and dims:
+            matrix = np.memmap(
+                self._matrix_path, dtype=np.float32, mode="r", shape=(len(docs), dims)
+            )
+
+        self._set(docs, matrix)
+
+    def _set(self, docs: List[Doc], matrix: np.ndarray) -> None:
+        # searches read these three together; they are replaced, never mutated
+        self._docs = docs
+        self._matrix = matrix
+        self._bm25 = BM25Index(
+            [" ".join(str(d.get(f) or "") for f in self.searchable) for d in docs]
+        )
+        # what is on disk, kept current by appends between reloads
+        self._keys = {d[self.key_field]: i for i, d in enumerate(docs)}
+        self._dims = matrix.shape[1]
+
+    def _write_meta(self) -> None:
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"count": len(self._keys), "dims": self._dims}, f)
+        os.replace(tmp, self._meta_path)
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in (self._meta_path, self._docs_path, self._matrix_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._set([], np.zeros((0, 0), dtype=np.float32))
+
+    def upload(self, actions: Iterable[Doc]) -> Dict[str, Any]:
+        succeeded = 0
+        with self._lock:
+            appended = False
+            for chunk in _chunks(actions, _UPLOAD_CHUNK):
+                if self._appendable(chunk):
+                    self._append(chunk)
+                    appended = True
+                else:
+                    if appended:
+                        # rewriting starts from the current contents, appends included
+                        self._load()
+                        appended = False
+                    self._rewrite(chunk)
+                succeeded += len(chunk)
+
+            if appended:
+                self._load()
+
+        return {"succeeded": succeeded, "batches": 1, "failed": []}
+
+    def _appendable(self, chunk: List[Doc]) -> bool:
+        keys = {action[self.key_field] for action in chunk}
+        if len(keys) < len(chunk) or any(key in self._keys for key in keys):
+            return False
+        if any(action.get("@search.action") == "delete" for action in chunk):
+            return False
+
+        dims = {len(a["embedding"]) for a in chunk if a.get("embedding") is not None}
+        if not self._keys:
+            return len(dims) <= 1
+        # existing rows have no vectors to extend, or new ones would change the width
+        return dims <= {self._dims} and (self._dims > 0 or not dims)
+
+    def _append(self, chunk: List[Doc]) -> None:
+        docs = [
+            {k: v for k, v in a.items() if k not in ("@search.action", "embedding")}
+            for a in chunk
+        ]
+        if not self._keys:
+            self._dims = next(
+                (len(a["embedding"]) for a in chunk if a.get("embedding") is not None),
+                0,
+            )
+
+        os.makedirs(self.path, exist_ok=True)
+        if self._dims:
+            matrix = np.zeros((len(chunk), self._dims), dtype=np.float32)
+            for i, action in enumerate(chunk):
+                if action.get("embedding") is not None:
+                    matrix[i] = _unit(action["embedding"])
+            with open(self._matrix_path, "ab" if self._keys else "wb") as f:
+                f.write(matrix.tobytes())
+
+        with open(self._docs_path, "a" if self._keys else "w", encoding="utf-8") as f:
+            for doc in docs:
+                f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+
+        for doc in docs:
+            self._keys[doc[self.key_field]] = len(self._keys)
+        self._write_meta()
+
+    def _rewrite(self, chunk: List[Doc]) -> None:
+        rows: Dict[str, Doc] = {d[self.key_field]: d for d in self._docs}
+        vectors: Dict[str, np.ndarray] = {
+            d[self.key_field]: self._matrix[i]
+            for i, d in enumerate(self._docs)
+            if self._matrix.shape[1]
+        }
+
+        for action in chunk:
+            key = action[self.key_field]
+            kind = action.get("@search.action", "mergeOrUpload")
+            fields = {
+                k: v
+                for k, v in action.items()
+                if k not in ("@search.action", "embedding")
+            }
+
+            if kind == "delete":
+                rows.pop(key, None)
+                vectors.pop(key, None)
+            elif kind in ("merge", "mergeOrUpload"):
+                rows[key] = {**rows.get(key, {}), **fields}
+            else:
+                rows[key] = fields
+
+            if kind != "delete" and action.get("embedding") is not None:
+                vectors[key] = _unit(action["embedding"])
+
+        self._write(list(rows.values()), vectors)
+
+    def _write(self, docs: List[Doc], vectors: Dict[str, np.ndarray]) -> None:
+        dims = len(next(iter(vectors.values()))) if vectors else 0
+        matrix = np.zeros((len(docs), dims), dtype=np.float32)
+        for i, doc in enumerate(docs):
+            vector = vectors.get(doc[self.key_field])
+            if vector is not None:
+                matrix[i] = vector
+
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self._matrix_path + ".tmp"
+        matrix.tofile(tmp)
+        os.replace(tmp, self._matrix_path)
+
+        tmp = self._docs_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for doc in docs:
+                f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+        os.replace(tmp, self._docs_path)
+
+        self._keys = {doc[self.key_field]: i for i, doc in enumerate(docs)}
+        self._dims = dims
+        self._write_meta()
+        self._load()
+
+    def search(
+        self, params: Dict[str, Any], embedding: Optional[List[float]] = None
+    ) -> List[Doc]:
+        docs, matrix, bm25 = self._docs, self._matrix, self._bm25
+        top = params.get("top") or 3
+        query = params.get("query") or ""
+
+        allowed = None
+        if params.get("filter"):
+            predicate = compile_filter(params["filter"])
+            allowed = np.fromiter((predicate(d) for d in docs), bool, len(docs))
+
+        if embedding is None and query.strip() in ("", "*"):
+            # match-all query: filtered documents in index order, as Azure returns them
+            hits = [(i, 1.0) for i in range(len(docs)) if allowed is None or allowed[i]]
+            if not params.get("orderby"):
+                hits = hits[:top]
+        elif embedding is None or not len(docs) or not matrix.shape[1]:
+            hits = bm25.top(query, top, allowed)
+        elif not params.get("hybrid", config["AZURE_SEARCH_HYBRID"]):
+            hits = self._vector_top(matrix, embedding, top, allowed)
+        else:
+            # like Azure hybrid queries: fuse a wider keyword and vector candidate set
+            candidates = max(top, _HYBRID_CANDIDATES)
+            hits = [
+                (hit["i"], hit["@search.score"])
+                for hit in reciprocal_rank_fusion(
+                    [
+                        [{"i": i} for i, _ in bm25.top(query, candidates, allowed)],
+                        [
+                            {"i": i}
+                            for i, _ in self._vector_top(
+                                matrix, embedding, candidates, allowed
+                            )
+                        ],
+                    ],
+                    k=config["SEARCH_RRF_K"],
+                    top=top,
+                    key=lambda hit: hit["i"],
+                )
+            ]
+
+        if params.get("orderby"):
+            order = {id(docs[i]): i for i, _ in hits}
+            scores = dict(hits)
+            ranked = order_by([docs[i] for i, _ in hits], params["orderby"])[:top]
+            hits = [(order[id(d)], scores[order[id(d)]]) for d in ranked]
+
+        return [
+            {**select_fields(docs[i], params.get("select")), "@search.score": score}
+            for i, score in hits
+        ]
+
+    @staticmethod
+    def _vector_top(
+        matrix: np.ndarray,
+        embedding: List[float],
+        top: int,
+        allowed: Optional[np.ndarray] = None,
+    ) -> List[tuple[int, float]]:
+        query = np.asarray(embedding, dtype=np.float32)
+        scores = matrix @ (query / max(float(np.linalg.norm(query)), 1e-12))
+        if allowed is not None:
+            scores = np.where(allowed, scores, -np.inf)
+        k = min(top, len(scores) if allowed is None else int(allowed.sum()))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        return sorted(
+            ((int(i), float(scores[i])) for i in best),
+            key=lambda hit: hit[1],
+            reverse=True,
+        )
+
+    async def asearch(
+        self, params: Dict[str, Any], embedding: Optional[List[float]] = None
+    ) -> List[Doc]:
+        # in-memory and sub-millisecond for the index sizes this is meant for
+        return self.search(params, embedding)
+
+
+def get_local_search_index(name: Optional[str] = None) -> LocalSearchIndex:
+    """Process-wide local index stored under `LOCAL_SEARCH_DIR/<index name>`."""
+    path = os.path.join(
+        config["LOCAL_SEARCH_DIR"], name or config["AZURE_SEARCH_API_INDEX"]
+    )
+    return client_registry.get_or_create(
+        ("local_search", path), lambda: LocalSearchIndex(path)
+    )
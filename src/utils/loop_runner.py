@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+from .registry import client_registry
+
+T = TypeVar("T")
+
+
+class LoopRunner:
+    """A long-lived event loop on a daemon thread, for running coroutines from sync code.
+
+    `asyncio.run` per call closes the loop every time, and with it every async
+    client bound to that loop (and their pooled connections). Running all sync
+    calls on one loop keeps those clients, and their warm connections, across
+    calls. `close` shuts the loop down cleanly; it also runs at exit.
+    """
+
+    def __init__(self, name: str = "loop-runner") -> None:
+        self.loop = asyncio.new_event_loop()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._serve, name=name, daemon=True)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Run `coro` on the loop and block until it finishes."""
+        if self._closed:
+            raise RuntimeError("LoopRunner is closed")
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("LoopRunner.run called from its own loop; await instead")
+
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # e.g. KeyboardInterrupt or timeout in the caller: stop the work too
+            future.cancel()
+            raise
+
+    async def _shutdown(self) -> None:
+        await client_registry.aclose_loop()
+
+        current = asyncio.current_task()
+        tasks = [t for t in asyncio.all_tasks() if t is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.loop.shutdown_asyncgens()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Close clients bound to the loop, cancel leftover tasks, stop the thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(
+                timeout
+            )
+        except Exception as e:
+            print(f"LoopRunner shutdown did not finish cleanly: {e}")
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+            if not self._thread.is_alive():
+                self.loop.close()
+
+
+def get_loop_runner() -> LoopRunner:
+    """Process-wide loop runner; the client registry closes it at exit."""
+    return client_registry.get_or_create(
+        ("loop_runner",), LoopRunner, close=LoopRunner.close
+    )
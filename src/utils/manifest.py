@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from globals import config
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def stable_id(*parts: Any) -> str:
+    """Deterministic index key (letters/digits only) derived from the given parts."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:32]
+
+
+class IngestionManifest:
+    """Per-index record of ingested source files: content hash -> index ids.
+
+    Lets ingestion skip unchanged files, re-ingest changed ones, and delete the
+    ids a changed or removed file no longer produces.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.pipeline: Optional[str] = None
+        self.documents: Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            self.pipeline = data.get("pipeline")
+            self.documents = data.get("documents", {})
+
+    def reset(self, pipeline: str) -> None:
+        """Forget everything, e.g. after the index was (re)created."""
+        self.pipeline = pipeline
+        self.documents = {}
+
+    def ids(self, source: str) -> List[str]:
+        return list(self.documents.get(source, {}).get("ids", []))
+
+    def assign_ids(self, source: str, rows: List[Dict[str, Any]]) -> List[bool]:
+        """Set each row's `id` from its source and content; returns which rows are
+        new to the index (an unchanged row keeps its id and need not be re-sent)."""
+        known = set(self.ids(source))
+        seen: Counter = Counter()
+        fresh = []
+
+        for row in rows:
+            body = json.dumps(
+                {
+                    k: v
+                    for k, v in row.items()
+                    if k not in ("id", "@search.action", "embedding")
+                },
+                sort_keys=True,
+            )
+            seen[body] += 1
+            row["id"] = stable_id(source, body, seen[body])
+            fresh.append(row["id"] not in known)
+
+        return fresh
+
+    def changed(self, docs: Iterable[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Docs (with `source` and `content`) that are new or differ from the manifest."""
+        return [
+            doc
+            for doc in docs
+            if self.documents.get(doc["source"], {}).get("hash")
+            != content_hash(doc["content"])
+        ]
+
+    def removed(self, sources: Iterable[str]) -> List[str]:
+        """Sources in the manifest that are no longer present."""
+        present = set(sources)
+        return [source for source in self.documents if source not in present]
+
+    def update(self, source: str, digest: str, ids: Iterable[str]) -> List[str]:
+        """Record a source's new ids; returns the previous ids that are now stale."""
+        ids = list(dict.fromkeys(ids))
+        stale = [i for i in self.ids(source) if i not in set(ids)]
+        self.documents[source] = {"hash": digest, "ids": ids}
+        return stale
+
+    def remove(self, source: str) -> List[str]:
+        """Drop a source; returns its ids."""
+        return self.documents.pop(source, {}).get("ids", [])
+
+    def save(self) -> None:
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        # write-then-rename so an interrupted run never leaves a truncated manifest
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(
+                {"pipeline": self.pipeline, "documents": self.documents},
+                fh,
+                indent=2,
+            )
+        os.replace(tmp, self.path)
+
+
+def get_ingestion_manifest(index: str) -> IngestionManifest:
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", index)
+    return IngestionManifest(
+        os.path.join(config["INGESTION_MANIFEST_DIR"], f"{name}.json")
+    )
@@ -0,0 +1,155 @@
+import re
+from typing import Any, Callable, Dict, List, Tuple
+
+Doc = Dict[str, Any]
+Predicate = Callable[[Doc], bool]
+
+_TOKEN = re.compile(
+    r"\s*(?:(?P<str>'(?:[^']|'')*')|(?P<num>-?\d+(?:\.\d+)?)|(?P<punct>[(),])"
+    r"|(?P<word>[A-Za-z_][\w.]*))"
+)
+
+_COMPARE = {
+    "eq": lambda a, b: a == b,
+    "ne": lambda a, b: a != b,
+    "gt": lambda a, b: a is not None and a > b,
+    "ge": lambda a, b: a is not None and a >= b,
+    "lt": lambda a, b: a is not None and a < b,
+    "le": lambda a, b: a is not None and a <= b,
+}
+
+_CONSTANTS = {"true": True, "false": False, "null": None}
+
+
+def _tokenize(expr: str) -> List[Tuple[str, Any]]:
+    tokens, pos, expr = [], 0, expr.strip()
+    while pos < len(expr):
+        m = _TOKEN.match(expr, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"Invalid filter near: {expr[pos:]!r}")
+        pos = m.end()
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "str":
+            value = value[1:-1].replace("''", "'")
+        elif kind == "num":
+            value = float(value) if "." in value else int(value)
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    """Recursive descent over the OData subset used by this repo's queries:
+    comparisons (eq ne gt ge lt le), search.in(field, 'a,b'[, sep]), not,
+    and/or with the usual precedence, and parentheses."""
+
+    def __init__(self, expr: str) -> None:
+        self.tokens = _tokenize(expr)
+        self.pos = 0
+
+    def peek(self) -> Tuple[str, Any]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else ("end", None)
+
+    def take(self, kind: str, value: Any = None) -> Any:
+        token = self.peek()
+        if token[0] != kind or (value is not None and token[1] != value):
+            raise ValueError(
+                f"Invalid filter: expected {value or kind}, got {token[1]!r}"
+            )
+        self.pos += 1
+        return token[1]
+
+    def parse(self) -> Predicate:
+        predicate = self.disjunction()
+        self.take("end")
+        return predicate
+
+    def disjunction(self) -> Predicate:
+        terms = [self.conjunction()]
+        while self.peek() == ("word", "or"):
+            self.pos += 1
+            terms.append(self.conjunction())
+        return terms[0] if len(terms) == 1 else lambda d: any(t(d) for t in terms)
+
+    def conjunction(self) -> Predicate:
+        terms = [self.unary()]
+        while self.peek() == ("word", "and"):
+            self.pos += 1
+            terms.append(self.unary())
+        return terms[0] if len(terms) == 1 else lambda d: all(t(d) for t in terms)
+
+    def unary(self) -> Predicate:
+        if self.peek() == ("word", "not"):
+            self.pos += 1
+            inner = self.unary()
+            return lambda d: not inner(d)
+
+        if self.peek() == ("punct", "("):
+            self.pos += 1
+            inner = self.disjunction()
+            self.take("punct", ")")
+            return inner
+
+        field = self.take("word")
+        if field == "search.in":
+            return self.search_in()
+
+        op = self.take("word")
+        if op not in _COMPARE:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        value = self.literal()
+        compare = _COMPARE[op]
+        return lambda d: compare(d.get(field), value)
+
+    def search_in(self) -> Predicate:
+        self.take("punct", "(")
+        field = self.take("word")
+        self.take("punct", ",")
+        values = self.take("str")
+        sep = " ,"
+        if self.peek() == ("punct", ","):
+            self.pos += 1
+            sep = self.take("str")
+        self.take("punct", ")")
+
+        allowed = {v for v in re.split(f"[{re.escape(sep)}]", values) if v}
+        return lambda d: d.get(field) in allowed
+
+    def literal(self) -> Any:
+        kind, value = self.peek()
+        self.pos += 1
+        if kind in ("str", "num"):
+            return value
+        if kind == "word" and value in _CONSTANTS:
+            return _CONSTANTS[value]
+        raise ValueError(f"Invalid filter literal: {value!r}")
+
+
+def compile_filter(expr: str) -> Predicate:
+    """Compile an Azure AI Search `$filter` expression into a document predicate."""
+    return _Parser(expr).parse()
+
+
+def sort_key(orderby: str) -> List[Tuple[str, bool]]:
+    """`"field [asc|desc], ..."` as (field, descending) pairs."""
+    keys = []
+    for part in orderby.split(","):
+        words = part.split()
+        if words:
+            keys.append((words[0], len(words) > 1 and words[1].lower() == "desc"))
+    return keys
+
+
+def _or_zero(value: Any) -> Any:
+    return 0 if value is None else value
+
+
+def order_by(docs: List[Doc], orderby: str) -> List[Doc]:
+    """Sort like `$orderby`; missing values sort first, as nulls do in Azure."""
+    for field, desc in reversed(sort_key(orderby)):
+        docs = sorted(
+            docs,
+            key=lambda d, f=field: (d.get(f) is not None, _or_zero(d.get(f))),
+            reverse=desc,
+        )
+    return docs
@@ -1,3 +1,5 @@
+from typing import Any, Dict, List, Optional, Sequence
+
 import orjson
 
 
@@ -10,3 +12,58 @@ def dump_json(x):
         import json
 
         return json.dumps(x, indent=2, ensure_ascii=False)
+
+
+def dump_json_compact(x):
+    """Minified JSON: no indentation or spaces, non-ASCII kept as-is."""
+    try:
+        return orjson.dumps(x).decode()
+    except Exception:
+        import json
+
+        return json.dumps(x, separators=(",", ":"), ensure_ascii=False)
+
+
+def project_docs(
+    docs: Sequence[Dict[str, Any]], fields: Sequence[str]
+) -> List[Dict[str, Any]]:
+    """Keep only `fields`, in that order, dropping empty values; scores are rounded."""
+    out = []
+    for doc in docs:
+        item = {}
+        for field in fields:
+            value = doc.get(field)
+            if value is None or value == "":
+                continue
+            if field == "@search.score":
+                value = round(float(value), 3)
+            item[field] = value
+        out.append(item)
+    return out
+
+
+def format_tool_docs(
+    docs: Sequence[Dict[str, Any]],
+    fields: Sequence[str],
+    fmt: str = "json",
+    text_field: str = "content",
+) -> str:
+    """Encode search results for a tool response.
+
+    - `json`: minified JSON list of the projected documents.
+    - `lines`: one `[n] field=value; ...` header per document, its text below.
+    """
+    items = project_docs(docs, fields)
+    if fmt != "lines":
+        return dump_json_compact(items)
+
+    blocks = []
+    for i, item in enumerate(items, 1):
+        text = item.pop(text_field, "")
+        header = "; ".join(f"{k.removeprefix('@search.')}={v}" for k, v in item.items())
+        blocks.append(f"[{i}] {header}\n{text}" if header else f"[{i}]\n{text}")
+    return "\n\n".join(blocks)
+
+
+def split_fields(value: Optional[str]) -> List[str]:
+    return [f.strip() for f in (value or "").split(",") if f.strip()]
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+from typing import List, Optional
+
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over a minute and holds at most a minute's worth.
+
+    `reserve` always debits, letting the level go negative: each caller is told
+    how long to wait for its share, so waiters are served in arrival order
+    without polling.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+        # a single request larger than the bucket can still go once it is full
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+
+class RateLimiter:
+    """Client-side requests/minute and tokens/minute budget for one deployment.
+
+    Shared by every thread and event loop calling that deployment; a limit of 0
+    means unlimited.
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0) -> None:
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._paused_until = 0.0
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            waits: List[float] = [self._paused_until - now]
+            if self._requests is not None:
+                waits.append(self._requests.reserve(1, now))
+            if self._tokens is not None and tokens:
+                waits.append(self._tokens.reserve(tokens, now))
+            return max(0.0, *waits)
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until a request of `tokens` tokens fits the budget."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """Async acquire; waits without blocking the event loop."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: Optional[float]) -> None:
+        """Hold every caller for `seconds`, e.g. after the service answered 429."""
+        if seconds:
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + seconds)
@@ -0,0 +1,129 @@
+import asyncio
+import atexit
+import inspect
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def _default_close(client: Any) -> Any:
+    close = getattr(client, "close", None)
+    if callable(close):
+        return close()
+
+
+class ClientRegistry:
+    """Process-wide store of SDK/HTTP clients, created once per key and shared across threads."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._clients: Dict[Hashable, Any] = {}
+        self._closers: Dict[Hashable, Callable[[Any], None]] = {}
+
+    def get_or_create(
+        self,
+        key: Hashable,
+        factory: Callable[[], T],
+        close: Optional[Callable[[T], None]] = None,
+    ) -> T:
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        # per-key lock so a slow factory (e.g. an IAM token exchange) only blocks its own key
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = factory()
+                with self._lock:
+                    self._clients[key] = client
+                    self._closers[key] = close or _default_close
+
+        return client
+
+    def get_or_create_for_loop(
+        self,
+        key: Hashable,
+        factory: Callable[[], T],
+        close: Optional[Callable[[T], Any]] = None,
+    ) -> T:
+        """Like get_or_create, for async clients that are bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        self._drop_closed_loops()
+        return self.get_or_create((key, loop), factory, close)
+
+    def _drop_closed_loops(self) -> None:
+        # clients bound to a finished loop are unusable and cannot be awaited closed
+        with self._lock:
+            stale = [
+                key
+                for key in self._clients
+                if isinstance(key, tuple)
+                and isinstance(key[-1], asyncio.AbstractEventLoop)
+                and key[-1].is_closed()
+            ]
+            for key in stale:
+                self._clients.pop(key, None)
+                self._closers.pop(key, None)
+                self._key_locks.pop(key, None)
+
+    def _pop(self, key: Hashable) -> tuple[Any, Optional[Callable[[Any], Any]]]:
+        with self._lock:
+            self._key_locks.pop(key, None)
+            return self._clients.pop(key, None), self._closers.pop(key, None)
+
+    def close(self, key: Hashable) -> None:
+        client, closer = self._pop(key)
+
+        if client is not None and closer is not None:
+            try:
+                result = closer(client)
+                if inspect.iscoroutine(result):
+                    # async clients should be closed with aclose_loop(); avoid a never-awaited warning
+                    result.close()
+            except Exception as e:
+                print(f"Failed to close client {key!r}: {e}")
+
+    def close_all(self) -> None:
+        with self._lock:
+            keys = list(self._clients)
+
+        for key in keys:
+            self.close(key)
+
+    async def aclose_loop(self) -> None:
+        """Close every client bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            keys = [
+                key
+                for key in self._clients
+                if isinstance(key, tuple) and key[-1] is loop
+            ]
+
+        for key in keys:
+            client, closer = self._pop(key)
+            if client is None or closer is None:
+                continue
+
+            try:
+                result = closer(client)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"Failed to close client {key!r}: {e}")
+
+    def keys(self) -> list[Hashable]:
+        with self._lock:
+            return list(self._clients)
+
+
+client_registry = ClientRegistry()
+
+atexit.register(client_registry.close_all)
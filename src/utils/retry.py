@@ -0,0 +1,167 @@
+import asyncio
+import email.utils
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import httpx
+import openai
+import requests
+from azure.core.exceptions import ServiceRequestError, ServiceResponseError
+
+from globals import config
+from .ratelimit import RateLimiter
+
+T = TypeVar("T")
+
+# the request was refused before it was processed, so even a non-idempotent call can be resent
+REFUSED_STATUS = {429, 503}
+RETRIABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# transport failures where the request may or may not have reached the service
+_TRANSIENT_ERRORS = (
+    TimeoutError,
+    ConnectionError,
+    httpx.TransportError,
+    openai.APIConnectionError,
+    requests.ConnectionError,
+    requests.Timeout,
+    ServiceRequestError,
+    ServiceResponseError,
+)
+
+
+class HttpStatusError(RuntimeError):
+    """Raised for an error status from a raw HTTP call; keeps the response for retries."""
+
+    def __init__(self, response: Any) -> None:
+        super().__init__(f"Status code: {response.status_code}. Error: {response.text}")
+        self.status_code = response.status_code
+        self.response = response
+
+
+def status_of(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def parse_retry_after(headers: Any) -> Optional[float]:
+    """Seconds from `retry-after-ms` / `Retry-After` (delta seconds or HTTP date)."""
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(
+                0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+            )
+        except (TypeError, ValueError):
+            return None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    return parse_retry_after(getattr(getattr(error, "response", None), "headers", None))
+
+
+def backoff_delay(
+    attempt: int,
+    base: float,
+    max_delay: float,
+    retry_after: Optional[float] = None,
+) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(max_delay, base * (2**attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, max_delay * 4))
+    return delay
+
+
+class RetryPolicy:
+    """Retries throttled and transient failures with backoff, behind an optional
+    shared rate limiter.
+
+    Non-idempotent calls are only resent when the service refused them outright
+    (429/503). A timeout or dropped connection might have been processed already,
+    so those calls are not retried.
+    """
+
+    def __init__(
+        self,
+        limiter: Optional[RateLimiter] = None,
+        *,
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+    ) -> None:
+        self.limiter = limiter
+        self.max_attempts = max_attempts or config["RETRY_MAX_ATTEMPTS"]
+        self.base_delay = base_delay or config["RETRY_BASE_DELAY"]
+        self.max_delay = max_delay or config["RETRY_MAX_DELAY"]
+
+    def should_retry(self, error: BaseException, idempotent: bool = True) -> bool:
+        status = status_of(error)
+        if status in REFUSED_STATUS:
+            return True
+        if not idempotent:
+            return False
+        if status is not None:
+            return status in RETRIABLE_STATUS
+        return isinstance(error, _TRANSIENT_ERRORS)
+
+    def _delay(self, attempt: int, error: BaseException) -> float:
+        delay = backoff_delay(
+            attempt, self.base_delay, self.max_delay, retry_after(error)
+        )
+        if self.limiter is not None and status_of(error) == 429:
+            # quota is shared: hold back every caller of this deployment, not just this one
+            self.limiter.pause(delay)
+        return delay
+
+    def call(
+        self, fn: Callable[[], T], *, tokens: int = 0, idempotent: bool = True
+    ) -> T:
+        for attempt in range(self.max_attempts):
+            if self.limiter is not None:
+                self.limiter.acquire(tokens)
+            try:
+                return fn()
+            except Exception as e:
+                if attempt + 1 >= self.max_attempts or not self.should_retry(
+                    e, idempotent
+                ):
+                    raise
+                time.sleep(self._delay(attempt, e))
+
+    async def acall(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        *,
+        tokens: int = 0,
+        idempotent: bool = True,
+    ) -> T:
+        for attempt in range(self.max_attempts):
+            if self.limiter is not None:
+                await self.limiter.aacquire(tokens)
+            try:
+                return await fn()
+            except Exception as e:
+                if attempt + 1 >= self.max_attempts or not self.should_retry(
+                    e, idempotent
+                ):
+                    raise
+                await asyncio.sleep(self._delay(attempt, e))
@@ -0,0 +1,151 @@
+import re
+from typing import Callable, List, Literal, Optional, Sequence
+
+import numpy as np
+
+from globals import config
+from .chunking import TokenChunker
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def adjacent_similarities(embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+    """Cosine similarity of each embedding with the next one, as a float32 array."""
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if len(matrix) < 2:
+        return np.empty(0, dtype=np.float32)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.maximum(norms, np.finfo(np.float32).tiny)
+    return np.einsum("ij,ij->i", matrix[:-1], matrix[1:])
+
+
+class SemanticChunker:
+    """Groups consecutive paragraphs into chunks while they stay on topic.
+
+    Paragraphs of all texts passed to `chunk_many` are token-counted in one
+    batch and embedded with a single `embed_fn(texts)` call; adjacent
+    similarities are one vectorized operation per text. A new chunk starts
+    at a breakpoint or when the next paragraph would exceed `max_tokens`.
+
+    - `mode="threshold"`: break where similarity < `threshold`.
+    - `mode="percentile"`: break at the least similar `100 - percentile` percent
+      of transitions within each text, so the cut-off adapts to the document.
+
+    Paragraphs longer than `max_tokens` are split with a `TokenChunker`.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        *,
+        max_tokens: int = 1000,
+        mode: Literal["threshold", "percentile"] = "threshold",
+        threshold: float = 0.80,
+        percentile: float = 90.0,
+        encoding_name: str = "cl100k_base",
+    ) -> None:
+        if mode not in ("threshold", "percentile"):
+            raise ValueError(f"Unknown breakpoint mode: {mode}")
+
+        self.embed_fn = embed_fn
+        self.max_tokens = max_tokens
+        self.mode = mode
+        self.threshold = threshold
+        self.percentile = percentile
+        self.splitter = TokenChunker(max_tokens, 0, encoding_name=encoding_name)
+
+    @staticmethod
+    def paragraphs(text: str) -> List[str]:
+        return [p.strip() for p in _PARAGRAPH_BREAK.split(text) if p.strip()]
+
+    def breakpoints(self, similarities: np.ndarray) -> np.ndarray:
+        """Boolean mask over transitions: True where a new chunk should start."""
+        if not len(similarities):
+            return np.zeros(0, dtype=bool)
+        if self.mode == "threshold":
+            return similarities < self.threshold
+
+        # the least similar transitions, by rank so ties cannot cancel every break
+        k = int(np.ceil(len(similarities) * (100.0 - self.percentile) / 100.0))
+        mask = np.zeros(len(similarities), dtype=bool)
+        mask[np.argsort(similarities, kind="stable")[:k]] = True
+        return mask
+
+    def chunk(self, text: str) -> List[str]:
+        return self.chunk_many([text])[0]
+
+    def chunk_many(self, texts: Sequence[str]) -> List[List[str]]:
+        per_text: List[List[str]] = []
+        counts: List[List[int]] = []
+
+        for pieces in self._split(texts):
+            per_text.append([p for p, _ in pieces])
+            counts.append([n for _, n in pieces])
+
+        flat = [p for paras in per_text for p in paras]
+        embeddings = self.embed_fn(flat) if flat else []
+
+        out: List[List[str]] = []
+        offset = 0
+        for paras, tokens in zip(per_text, counts):
+            breaks = self.breakpoints(
+                adjacent_similarities(embeddings[offset : offset + len(paras)])
+            )
+            offset += len(paras)
+            out.append(self._group(paras, tokens, breaks))
+
+        return out
+
+    def _split(self, texts: Sequence[str]) -> List[List[tuple[str, int]]]:
+        """Paragraphs of each text with their token counts, encoding every
+        paragraph once; oversized paragraphs are split into token windows."""
+        per_text = [self.paragraphs(text) for text in texts]
+        flat = [p for paras in per_text for p in paras]
+        encoded = iter(self.splitter.encode_many(flat))
+
+        out = []
+        for paras in per_text:
+            pieces: List[tuple[str, int]] = []
+            for para in paras:
+                tokens = next(encoded)
+                if len(tokens) <= self.max_tokens:
+                    pieces.append((para, len(tokens)))
+                    continue
+                for s, e, n in self.splitter.token_spans(para, tokens):
+                    pieces.append((para[s:e], n))
+            out.append(pieces)
+        return out
+
+    def _group(
+        self, paras: List[str], tokens: List[int], breaks: np.ndarray
+    ) -> List[str]:
+        chunks: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+
+        for i, (para, n) in enumerate(zip(paras, tokens)):
+            if current and (breaks[i - 1] or current_tokens + n > self.max_tokens):
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(para)
+            current_tokens += n
+
+        if current:
+            chunks.append("\n\n".join(current))
+
+        return chunks
+
+
+def get_semantic_chunker(
+    embed_fn: Callable[[List[str]], List[List[float]]],
+    max_tokens: Optional[int] = None,
+) -> SemanticChunker:
+    """Semantic chunker configured from `SEMANTIC_CHUNK_*` settings."""
+    return SemanticChunker(
+        embed_fn,
+        max_tokens=max_tokens or config["SEMANTIC_CHUNK_MAX_TOKENS"],
+        mode=config["SEMANTIC_CHUNK_MODE"],
+        threshold=config["SEMANTIC_CHUNK_THRESHOLD"],
+        percentile=config["SEMANTIC_CHUNK_PERCENTILE"],
+    )
@@ -0,0 +1,44 @@
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+
+class TextStream:
+    """Async iterator of text deltas.
+
+    `producer(stream)` yields the deltas and may record extra fields in `stream.trace`.
+    Once iteration finishes, `text` holds the full answer and `trace` includes
+    time-to-first-token and total time.
+    """
+
+    def __init__(self, producer: Callable[["TextStream"], AsyncIterator[str]]) -> None:
+        self._producer = producer
+        self.text = ""
+        self.trace: Dict[str, Any] = {}
+        self.started_at: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        self.started_at = time.time()
+
+        async for delta in self._producer(self):
+            if not delta:
+                continue
+
+            if self.first_token_at is None:
+                self.first_token_at = time.time()
+                self.trace["ttft_ms"] = round(
+                    (self.first_token_at - self.started_at) * 1000, 1
+                )
+
+            self.text += delta
+            yield delta
+
+        self.trace.setdefault("ttft_ms", None)
+        self.trace["elapsed_ms"] = round((time.time() - self.started_at) * 1000, 1)
+
+    async def collect(self) -> str:
+        """Drain the stream and return the full text."""
+        async for _ in self:
+            pass
+
+        return self.text
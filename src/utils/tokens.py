@@ -0,0 +1,36 @@
+from functools import lru_cache
+from typing import Iterable, List
+
+import tiktoken
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = "cl100k_base") -> tiktoken.Encoding:
+    """Load a tiktoken encoding once per process."""
+    return tiktoken.get_encoding(name)
+
+
+def count_tokens(text: str, encoding_name: str = "cl100k_base") -> int:
+    return len(get_encoding(encoding_name).encode(text, disallowed_special=()))
+
+
+def plan_token_batches(
+    token_counts: Iterable[int], max_items: int, max_tokens: int
+) -> List[List[int]]:
+    """Group input indices, in order, into batches under both an item and a token limit."""
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+
+    for i, n in enumerate(token_counts):
+        if current and (len(current) >= max_items or current_tokens + n > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+
+        current.append(i)
+        current_tokens += n
+
+    if current:
+        batches.append(current)
+
+    return batches